@@ -0,0 +1,68 @@
+"""
+Compares the alphabeta and negamax engines of minimax on random 4x4 and
+5x5 positions, checking that both find moves of the same value.
+
+Usage: python bench_engines.py [positions]
+"""
+
+import random
+import sys
+
+import tictactoe as ttt
+
+# Board size and number of empty squares left in each benchmark position
+SETUPS = [(4, 9), (4, 11), (5, 11), (5, 13)]
+
+
+def random_position(size, empties, rng):
+    """
+    Returns a non-terminal size x size board with empties squares left,
+    reached by random play.
+    """
+    while True:
+        board = ttt.initial_state(size)
+        while (len(ttt.actions(board)) > empties
+               and not ttt.terminal(board)):
+            move = rng.choice(sorted(ttt.actions(board)))
+            board = ttt.result(board, move)
+        if not ttt.terminal(board):
+            return board
+
+
+def value(board, move):
+    """
+    Returns the exact utility of playing move on board.
+    """
+    board = ttt.result(board, move)
+    reply = ttt.minimax(board)
+    while reply is not None:
+        board = ttt.result(board, reply)
+        reply = ttt.minimax(board)
+    return ttt.utility(board)
+
+
+def main():
+    positions = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rng = random.Random(0)
+
+    for size, empties in SETUPS:
+        totals = {}
+        for _ in range(positions):
+            board = random_position(size, empties, rng)
+            values = set()
+            for engine in ("alphabeta", "negamax"):
+                stats = ttt.SearchStats()
+                move = ttt.minimax(board, stats=stats, engine=engine)
+                values.add(value(board, move))
+                nodes, seconds = totals.get(engine, (0, 0.0))
+                totals[engine] = (nodes + stats.nodes, seconds + stats.time)
+            if len(values) != 1:
+                raise Exception(f"engines disagree on {board}")
+
+        print(f"{size}x{size}, {empties} empty, {positions} positions")
+        for engine, (nodes, seconds) in totals.items():
+            print(f"    {engine:10} {nodes:10} nodes {seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,9 @@ import pygame
 import sys
 import time
 import os
+import threading
+import json
+from concurrent.futures import ThreadPoolExecutor
 os.environ["SDL_VIDEODRIVER"] = "dummy"
 
 import tictactoe as ttt
@@ -18,42 +21,213 @@ screen = pygame.display.set_mode(size)
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+smallFont = pygame.font.Font("OpenSans-Regular.ttf", 14)
+
+
+class AIWorker():
+    """
+    Runs the minimax search on a background thread so the frame loop
+    keeps rendering and handling events while the computer is thinking.
+    """
+
+    def __init__(self, delay=0.5):
+        self.delay = delay
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = None
+        self.cancel_event = None
+        self.stats = None
+
+    def busy(self):
+        return self.future is not None
+
+    def start(self, board):
+        """
+        Starts searching for a move on board, cancelling any earlier search.
+        """
+        self.cancel()
+        cancel_event = threading.Event()
+        stats = ttt.SearchStats()
+
+        def search():
+            # Keep the short pause before the move without blocking the UI
+            if cancel_event.wait(self.delay):
+                raise ttt.Cancelled()
+            return ttt.minimax(board, cancel=cancel_event, stats=stats)
+
+        self.cancel_event = cancel_event
+        self.stats = stats
+        self.future = self.executor.submit(search)
+
+    def poll(self):
+        """
+        Returns the move once the search has finished, otherwise None.
+        """
+        if self.future is None or not self.future.done():
+            return None
+        future = self.future
+        self.future = None
+        self.cancel_event = None
+        return future.result()
+
+    def cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.future = None
+        self.cancel_event = None
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+
+
+class FrameStats():
+    """
+    Frame-time statistics, collected while the computer is thinking.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, frame_time):
+        self.frames += 1
+        self.total += frame_time
+        self.worst = max(self.worst, frame_time)
+
+    def average(self):
+        return self.total / self.frames if self.frames else 0.0
+
+    def __str__(self):
+        return (f"avg {1000 * self.average():.1f} ms / "
+                f"max {1000 * self.worst:.1f} ms")
+
+
+# Cap the frame rate so an idle window does not spin the CPU
+FPS = 30
+clock = pygame.time.Clock()
+
+# Pre-rendered text and glyph surfaces, keyed by (font, text, color)
+text_cache = {}
+
+
+def render(font, text, color):
+    """
+    Returns a cached surface for text, rendering it only the first time.
+    """
+    key = (font, text, color)
+    if key not in text_cache:
+        text_cache[key] = font.render(text, True, color)
+    return text_cache[key]
+
+
+def blit_centered(surface, center):
+    rect = surface.get_rect()
+    rect.center = center
+    screen.blit(surface, rect)
+
+
+def draw_button(button, label):
+    pygame.draw.rect(screen, white, button)
+    blit_centered(render(mediumFont, label, black), button.center)
+
+
+# Screen regions, and the content last drawn in each of them
+titleRegion = pygame.Rect(0, 0, width, 70)
+statsRegion = pygame.Rect(0, height - 30, width / 3 - 5, 30)
+playXButton = pygame.Rect((width / 8), (height / 2), width / 4, 50)
+playOButton = pygame.Rect(5 * (width / 8), (height / 2), width / 4, 50)
+againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+
+tile_size = 80
+tile_origin = (width / 2 - (1.5 * tile_size),
+               height / 2 - (1.5 * tile_size))
+tiles = []
+for i in range(3):
+    row = []
+    for j in range(3):
+        row.append(pygame.Rect(
+            tile_origin[0] + j * tile_size,
+            tile_origin[1] + i * tile_size,
+            tile_size, tile_size
+        ))
+    tiles.append(row)
+
+drawn = {}
+dirty = []
+
+
+def update_region(name, rect, content):
+    """
+    Returns True if rect has to be redrawn because its content changed,
+    after clearing it and marking it dirty for the next display update.
+    """
+    if name in drawn and drawn[name] == content:
+        return False
+    drawn[name] = content
+    screen.fill(black, rect)
+    dirty.append(rect)
+    return True
+
+
+# Optionally dump the search stats of every AI move as JSON:
+#   python runner.py --stats stats.json
+stats_path = None
+if len(sys.argv) == 3 and sys.argv[1] == "--stats":
+    stats_path = sys.argv[2]
+elif len(sys.argv) != 1:
+    sys.exit("Usage: python runner.py [--stats FILE]")
+search_stats = []
+
+
+def dump_search_stats(stats):
+    search_stats.append(stats.as_dict())
+    with open(stats_path, "w") as f:
+        json.dump(search_stats, f, indent=2)
+
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+worker = AIWorker()
+frame_stats = FrameStats()
+last_frame = time.perf_counter()
+mode = None
 
 while True:
 
+    now = time.perf_counter()
+    if worker.busy():
+        frame_stats.add(now - last_frame)
+    last_frame = now
+
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            worker.shutdown()
             sys.exit()
 
-    screen.fill(black)
+    # Redraw everything when switching between the menu and the game
+    if mode != (user is None):
+        mode = (user is None)
+        drawn.clear()
+        screen.fill(black)
+        dirty.append(screen.get_rect())
 
     # Let user choose a player.
     if user is None:
 
         # Draw title
-        title = largeFont.render("Play Tic-Tac-Toe", True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 50)
-        screen.blit(title, titleRect)
+        if update_region("title", titleRegion, "Play Tic-Tac-Toe"):
+            blit_centered(render(largeFont, "Play Tic-Tac-Toe", white),
+                          ((width / 2), 50))
 
         # Draw buttons
-        playXButton = pygame.Rect((width / 8), (height / 2), width / 4, 50)
-        playX = mediumFont.render("Play as X", True, black)
-        playXRect = playX.get_rect()
-        playXRect.center = playXButton.center
-        pygame.draw.rect(screen, white, playXButton)
-        screen.blit(playX, playXRect)
-
-        playOButton = pygame.Rect(5 * (width / 8), (height / 2), width / 4, 50)
-        playO = mediumFont.render("Play as O", True, black)
-        playORect = playO.get_rect()
-        playORect.center = playOButton.center
-        pygame.draw.rect(screen, white, playOButton)
-        screen.blit(playO, playORect)
+        if update_region("playX", playXButton, "Play as X"):
+            draw_button(playXButton, "Play as X")
+        if update_region("playO", playOButton, "Play as O"):
+            draw_button(playOButton, "Play as O")
 
         # Check if button is clicked
         click, _, _ = pygame.mouse.get_pressed()
@@ -68,28 +242,15 @@ while True:
 
     else:
 
-        # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
-        tiles = []
+        # Draw game board, only the tiles whose contents changed
         for i in range(3):
-            row = []
             for j in range(3):
-                rect = pygame.Rect(
-                    tile_origin[0] + j * tile_size,
-                    tile_origin[1] + i * tile_size,
-                    tile_size, tile_size
-                )
-                pygame.draw.rect(screen, white, rect, 3)
-
-                if board[i][j] != ttt.EMPTY:
-                    move = moveFont.render(board[i][j], True, white)
-                    moveRect = move.get_rect()
-                    moveRect.center = rect.center
-                    screen.blit(move, moveRect)
-                row.append(rect)
-            tiles.append(row)
+                rect = tiles[i][j]
+                if update_region((i, j), rect, board[i][j]):
+                    pygame.draw.rect(screen, white, rect, 3)
+                    if board[i][j] != ttt.EMPTY:
+                        blit_centered(render(moveFont, board[i][j], white),
+                                      rect.center)
 
         game_over = ttt.terminal(board)
         player = ttt.player(board)
@@ -105,20 +266,29 @@ while True:
             title = f"Play as {user}"
         else:
             title = f"Computer thinking..."
-        title = largeFont.render(title, True, white)
-        titleRect = title.get_rect()
-        titleRect.center = ((width / 2), 30)
-        screen.blit(title, titleRect)
+        if update_region("title", titleRegion, title):
+            blit_centered(render(largeFont, title, white), ((width / 2), 30))
 
         # Check for AI move
+        stats = None
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
+            if not worker.busy():
+                frame_stats.reset()
+                worker.start(board)
             else:
-                ai_turn = True
+                move = worker.poll()
+                if move is not None:
+                    board = ttt.result(board, move)
+                    if stats_path is not None:
+                        dump_search_stats(worker.stats)
+
+            # Show frame-time stats while the computer is thinking
+            stats = str(frame_stats)
+        if update_region("stats", statsRegion, stats) and stats is not None:
+            surface = smallFont.render(stats, True, white)
+            statsRect = surface.get_rect()
+            statsRect.bottomleft = (10, height - 10)
+            screen.blit(surface, statsRect)
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
@@ -129,20 +299,25 @@ while True:
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
+        # Let the user restart, also while the computer is thinking
+        label = None
         if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
+            label = "Play Again"
+        elif worker.busy():
+            label = "Restart"
+        if update_region("again", againButton, label) and label is not None:
+            draw_button(againButton, label)
+        if label is not None:
             click, _, _ = pygame.mouse.get_pressed()
             if click == 1:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    worker.cancel()
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
-    pygame.display.flip()
+    if dirty:
+        pygame.display.update(dirty)
+        dirty.clear()
+    clock.tick(FPS)
@@ -3,28 +3,28 @@ Tic Tac Toe Player
 """
 
 import math
-import copy
+import json
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
 
 
-def initial_state():
+def initial_state(size=3):
     """
-    Returns starting state of the board.
+    Returns starting state of the board, size x size squares.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * size for _ in range(size)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
+    filled = sum([len(row) - row.count(None) for row in board])
     
-    if sum([row.count(None) for row in board]) % 2 != 0:
+    if filled % 2 == 0:
         player_turn = "X"
         
     else:
@@ -58,7 +58,7 @@ def result(board, action):
     if board[i][j] != None:
         raise NameError('Not Possible')
     
-    new_board = copy.deepcopy(board)
+    new_board = [row[:] for row in board]
     new_board[i][j] = player(board)
     
     return new_board
@@ -83,16 +83,17 @@ def winner(board):
         
         lines.append(col)    
         
-    lines.append((board[0][0], board[1][1], board[2][2]))
-    lines.append((board[0][2], board[1][1], board[2][0]))
+    size = len(board)
+    lines.append([board[i][i] for i in range(size)])
+    lines.append([board[i][size - 1 - i] for i in range(size)])
     
     for line in lines:
         
-        if line.count("X") == 3:
+        if line.count("X") == size:
                 
             return "X"
             
-        elif line.count("O") == 3:
+        elif line.count("O") == size:
             
             return "O"
         
@@ -129,54 +130,413 @@ def utility(board):
     else:
         return 0
 
-def max_value(board):
+class Cancelled(Exception):
+    """
+    Raised inside the search when its cancel event has been set.
+    """
+
+
+class SearchStats():
+    """
+    Counters describing the work done by one minimax search.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.terminals = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cutoffs = 0
+        self.max_depth = 0
+        self.time = 0.0
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "terminals": self.terminals,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cutoffs": self.cutoffs,
+            "max_depth": self.max_depth,
+            "time": self.time
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+
+# Transposition cache flags: the stored value is exact, or only a bound
+EXACT = 0
+LOWER = 1
+UPPER = -1
+
+
+class Search():
+    """
+    State shared by every node of one search: transposition cache,
+    statistics and an optional cancel event.
+    """
+
+    def __init__(self, cancel=None, stats=None):
+        self.cancel = cancel
+        self.stats = stats if stats is not None else SearchStats()
+        self.cache = {}
+
+    def visit(self, depth):
+        """
+        Records a visited node, raising Cancelled if the search was cancelled.
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            raise Cancelled()
+        self.stats.nodes += 1
+        self.stats.max_depth = max(self.stats.max_depth, depth)
+
+    def lookup(self, key, alpha, beta):
+        """
+        Returns the cached value of key if it settles the (alpha, beta)
+        window, otherwise None.
+        """
+        entry = self.cache.get(key)
+        if entry is not None:
+            value, flag = entry
+            if (flag == EXACT
+                    or (flag == LOWER and value >= beta)
+                    or (flag == UPPER and value <= alpha)):
+                self.stats.cache_hits += 1
+                return value
+        self.stats.cache_misses += 1
+        return None
+
+    def store(self, key, value, alpha, beta):
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.cache[key] = (value, flag)
+
+
+def board_key(board):
+    """
+    Returns a hashable key for board.
+    """
+    return tuple(tuple(row) for row in board)
+
+
+def max_value(board, alpha, beta, depth, search):
     
-    v = -1
+    search.visit(depth)
     if terminal(board) == True:
+        search.stats.terminals += 1
         return utility(board)
-    
+
+    key = board_key(board)
+    cached = search.lookup(key, alpha, beta)
+    if cached is not None:
+        return cached
+
+    v = -math.inf
+    window = alpha
     for action in actions(board):
-        v = max(v, min_value(result(board, action)))
+        v = max(v, min_value(result(board, action), alpha, beta, depth + 1, search))
+        alpha = max(alpha, v)
+        if alpha >= beta:
+            search.stats.cutoffs += 1
+            break
+
+    search.store(key, v, window, beta)
     return v    
 
-def min_value(board):
+def min_value(board, alpha, beta, depth, search):
     
-    v = 1
+    search.visit(depth)
     if terminal(board) == True:
+        search.stats.terminals += 1
         return utility(board)
-    
+
+    key = board_key(board)
+    cached = search.lookup(key, alpha, beta)
+    if cached is not None:
+        return cached
+
+    v = math.inf
+    window = beta
     for action in actions(board):
-        v = min(v, max_value(result(board, action)))
+        v = min(v, max_value(result(board, action), alpha, beta, depth + 1, search))
+        beta = min(beta, v)
+        if alpha >= beta:
+            search.stats.cutoffs += 1
+            break
+
+    search.store(key, v, alpha, window)
     return v   
 
-def minimax(board):
+def alphabeta(board, search):
+    """
+    Returns the best action on board using max_value and min_value.
+    """
+    search.visit(0)
+    alpha = -math.inf
+    beta = math.inf
+    best = None
+
+    if player(board) == "X":
+        for action in actions(board):
+            v = min_value(result(board, action), alpha, beta, 1, search)
+            if best is None or v > alpha:
+                alpha = v
+                best = action
+    else:
+        for action in actions(board):
+            v = max_value(result(board, action), alpha, beta, 1, search)
+            if best is None or v < beta:
+                beta = v
+                best = action
+
+    return best
+
+
+def winning_lines(size):
+    """
+    Returns the (i, j) squares of every winning line of a size x size
+    board: rows, columns, then both diagonals.
+    """
+    lines = [[(i, j) for j in range(size)] for i in range(size)]
+    lines += [[(i, j) for i in range(size)] for j in range(size)]
+    lines.append([(i, i) for i in range(size)])
+    lines.append([(i, size - 1 - i) for i in range(size)])
+    return lines
+
+
+# Negamax scores: a won game is worth WIN to the player who won it
+WIN = 1
+ASPIRATION = 1
+
+
+class NegamaxSearch(Search):
+    """
+    Search state for the negamax engine: transposition cache entries also
+    keep the best move found, plus killer moves per ply and history scores
+    per move for move ordering.
+    """
+
+    def __init__(self, cancel=None, stats=None):
+        super().__init__(cancel, stats)
+        self.killers = {}
+        self.history = {}
+
+    def lookup(self, key, alpha, beta):
+        """
+        Returns (value, move) from the cache, where value is None unless
+        the entry settles the (alpha, beta) window.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            self.stats.cache_misses += 1
+            return None, None
+
+        value, flag, move = entry
+        if (flag == EXACT
+                or (flag == LOWER and value >= beta)
+                or (flag == UPPER and value <= alpha)):
+            self.stats.cache_hits += 1
+            return value, move
+        self.stats.cache_misses += 1
+        return None, move
+
+    def store(self, key, value, alpha, beta, move):
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.cache[key] = (value, flag, move)
+
+    def order(self, moves, ply, cached_move):
+        """
+        Returns moves sorted by the cached best move, then killer moves,
+        then history score.
+        """
+        killers = self.killers.get(ply, [])
+
+        def rank(move):
+            if move == cached_move:
+                return (0, 0)
+            if move in killers:
+                return (1, killers.index(move))
+            return (2, -self.history.get(move, 0))
+
+        return sorted(moves, key=rank)
+
+    def cutoff(self, move, ply, depth):
+        """
+        Records that move caused a beta cutoff at ply, with depth plies
+        left to play below it.
+        """
+        self.stats.cutoffs += 1
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+def negamax(board, alpha, beta, ply, search):
+    """
+    Returns the score of board for the player to move, using
+    principal-variation search inside the (alpha, beta) window.
+    """
+    search.visit(ply)
+    if terminal(board) == True:
+        search.stats.terminals += 1
+        color = 1 if player(board) == X else -1
+        return color * utility(board) * WIN
+
+    key = board_key(board)
+    cached, cached_move = search.lookup(key, alpha, beta)
+    if cached is not None:
+        return cached
+
+    window = alpha
+    best = -math.inf
+    best_move = None
+    moves = search.order(actions(board), ply, cached_move)
+    depth = len(moves)
+    for k, action in enumerate(moves):
+        child = result(board, action)
+        if k == 0:
+            v = -negamax(child, -beta, -alpha, ply + 1, search)
+        else:
+            # Try to prove the move is no better than the principal
+            # variation, searching it fully only if that fails
+            v = -negamax(child, -alpha - 1, -alpha, ply + 1, search)
+            if alpha < v < beta:
+                v = -negamax(child, -beta, -alpha, ply + 1, search)
+        if v > best:
+            best = v
+            best_move = action
+        alpha = max(alpha, v)
+        if alpha >= beta:
+            search.cutoff(action, ply, depth)
+            break
+
+    search.store(key, best, window, beta, best_move)
+    return best
+
+
+def negamax_root(board, search, guess=0):
+    """
+    Returns the best action on board, searching first in an aspiration
+    window around the guessed score and widening it if the score falls
+    outside.
+    """
+    alpha = guess - ASPIRATION
+    beta = guess + ASPIRATION
+    score = negamax(board, alpha, beta, 0, search)
+    if score <= alpha:
+        negamax(board, -math.inf, score + 1, 0, search)
+    elif score >= beta:
+        negamax(board, score - 1, math.inf, 0, search)
+
+    return search.cache[board_key(board)][2]
+
+
+def minimax(board, cancel=None, stats=None, engine="alphabeta"):
     """
     Returns the optimal action for the current player on the board.
+
+    engine is "alphabeta" (alpha-beta pruning with a transposition cache)
+    or "negamax" (negamax with principal-variation search, killer and
+    history move ordering and an aspiration window around a draw). If
+    stats (a SearchStats) is given, it is filled in with the work done. If
+    cancel (a threading.Event) is given and gets set while searching,
+    Cancelled is raised so a background search can be abandoned.
     """
     if terminal(board) == True:
         return None
-    
-    actions = actions(board)
-    act_ratings = []
-    
-    if player(board) == "X":
-        
-        for action in actions:
-            act_ratings.append(max_value(board))
-    
-        return actions[act_ratings.index(max(act_ratings))]
-        
+
+    if engine == "alphabeta":
+        search = Search(cancel, stats)
+        root = alphabeta
+    elif engine == "negamax":
+        search = NegamaxSearch(cancel, stats)
+        root = negamax_root
     else:
-        
-        for action in actions:
-            act_ratings.append(min_value(board))
-            
-        return actions[act_ratings.index(min(act_ratings))]       
-            
+        raise ValueError(f"unknown engine {engine}")
 
-        
-    
-        
+    start = time.perf_counter()
+    try:
+        return root(board, search)
+    finally:
+        search.stats.time = time.perf_counter() - start
 
-    
-    
+
+def encode(board):
+    """
+    Returns board as a flat int8 array: 1 for X, -1 for O, 0 for EMPTY.
+    """
+    import numpy as np
+
+    return np.array([1 if cell == X else -1 if cell == O else 0
+                     for row in board for cell in row], dtype=np.int8)
+
+
+def encode_boards(boards):
+    """
+    Returns an (N, cells) int8 array encoding every board in boards.
+    """
+    import numpy as np
+
+    return np.stack([encode(board) for board in boards])
+
+
+def line_masks(size=3):
+    """
+    Returns an (L, size * size) 0/1 matrix, one row per winning line
+    (rows, columns, then both diagonals) of a size x size board.
+    """
+    import numpy as np
+
+    lines = winning_lines(size)
+    masks = np.zeros((len(lines), size * size), dtype=np.int8)
+    for k, line in enumerate(lines):
+        for i, j in line:
+            masks[k, i * size + j] = 1
+    return masks
+
+
+def batch_evaluate(boards):
+    """
+    Evaluates an (N, cells) array of encoded boards at once.
+
+    Returns (winners, terminals, players, moves) where winners holds the
+    utility of each board (1, -1 or 0), terminals is a bool array,
+    players is 1 if X is to move and -1 for O, and moves is an (N, cells)
+    bool mask of empty squares, matching winner(), terminal(), player()
+    and actions() on every board reachable in play.
+
+    NumPy is imported only when the batch functions are called, so the
+    game itself needs only pygame.
+    """
+    import numpy as np
+
+    boards = np.asarray(boards, dtype=np.int8)
+    size = math.isqrt(boards.shape[1])
+    if size * size != boards.shape[1]:
+        raise ValueError("boards must have a square number of cells")
+
+    # Sum each line on every board; a full line sums to +size or -size
+    sums = boards.astype(np.int32) @ line_masks(size).T.astype(np.int32)
+    x_wins = (sums == size).any(axis=1)
+    o_wins = (sums == -size).any(axis=1)
+    winners = np.where(x_wins, 1, np.where(o_wins, -1, 0)).astype(np.int8)
+
+    moves = boards == 0
+    empties = moves.sum(axis=1)
+    terminals = (winners != 0) | (empties == 0)
+    filled = boards.shape[1] - empties
+    players = np.where(filled % 2 == 0, 1, -1).astype(np.int8)
+
+    return winners, terminals, players, moves
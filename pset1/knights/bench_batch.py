@@ -0,0 +1,65 @@
+"""
+Times checking growing numbers of queries against one knowledge base,
+one model_check call per query versus a single model_check_all call.
+
+Usage: python bench_batch.py [symbols]
+"""
+
+import random
+import sys
+import time
+
+from logic import *
+
+
+def knowledge_base(n, rng):
+    """
+    Returns a random knowledge base over n symbols: a chain of
+    implications from a known fact forcing the first half, and loose
+    implications between the second half giving it many models.
+    """
+    symbols = [Symbol(f"P{i}") for i in range(n)]
+    half = n // 2
+    knowledge = And()
+    knowledge.add(symbols[0])
+    for i in range(half - 1):
+        knowledge.add(Implication(symbols[i], symbols[i + 1]))
+    for _ in range(half):
+        a, b, c = rng.sample(symbols[half:], 3)
+        knowledge.add(Implication(a, Or(b, c)))
+    return knowledge, symbols
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rng = random.Random(0)
+    knowledge, symbols = knowledge_base(n, rng)
+    pool = []
+    for _ in range(64):
+        symbol = rng.choice(symbols)
+        pool.append(symbol if rng.random() < 0.5 else Not(symbol))
+
+    print(f"{n} symbols")
+    print(f"{'queries':>8} {'separate':>10} {'prune':>10} {'sat':>10}")
+    for count in (1, 2, 4, 8, 16, 32, 64):
+        queries = pool[:count]
+        separate, t1 = timed(
+            lambda: [model_check(knowledge, query) for query in queries]
+        )
+        batch, t2 = timed(lambda: model_check_all(knowledge, queries))
+        sat, t3 = timed(
+            lambda: model_check_all(knowledge, queries, backend="sat")
+        )
+        if not separate == batch == sat:
+            raise Exception("backends disagree")
+        print(f"{count:>8} {t1:>10.4f} {t2:>10.4f} {t3:>10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Times model_count and probability on chains of implications of growing
+length, checking their results: a chain of n symbols, each implying the
+next, has n + 1 models, and the i-th symbol (from 0) is true in i + 1.
+
+Usage: python bench_count.py [symbols]
+"""
+
+import fractions
+import sys
+import time
+
+from logic import *
+
+
+def chain(n):
+    """Returns a knowledge base of n symbols, each implying the next, and
+    its symbols."""
+    symbols = [Symbol(f"P{i}") for i in range(n)]
+    knowledge = And()
+    for i in range(n - 1):
+        knowledge.add(Implication(symbols[i], symbols[i + 1]))
+    return knowledge, symbols
+
+
+def main():
+    largest = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    for n in (10, 30, 100, 300, 1000, 3000, 10000, 30000):
+        if n > largest:
+            break
+        knowledge, symbols = chain(n)
+        i = n // 2
+
+        start = time.perf_counter()
+        models = model_count(knowledge)
+        holds = probability(knowledge, symbols[i])
+        seconds = time.perf_counter() - start
+
+        if models != n + 1:
+            raise Exception(f"{models} models of a chain of {n}")
+        if holds != fractions.Fraction(i + 1, n + 1):
+            raise Exception(f"probability {holds} in a chain of {n}")
+        print(f"{n:>6} symbols {seconds:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
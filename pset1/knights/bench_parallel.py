@@ -0,0 +1,53 @@
+"""
+Times parallel_check against enumerate_check on an entailed query, so
+every model is checked, for growing numbers of processes.
+
+Usage: python bench_parallel.py [symbols]
+"""
+
+import os
+import sys
+import time
+
+from logic import *
+
+
+def knowledge_base(n):
+    """
+    Returns a knowledge base over n symbols forcing the first of them,
+    and a query it entails.
+    """
+    symbols = [Symbol(f"P{i}") for i in range(n)]
+    knowledge = And(symbols[0])
+    for i in range(n - 1):
+        knowledge.add(Implication(symbols[i + 1], symbols[i]))
+    return knowledge, Or(symbols[0], symbols[-1])
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 22
+    knowledge, query = knowledge_base(n)
+
+    print(f"{n} symbols, {os.cpu_count()} cores")
+    entailed, base = timed(lambda: enumerate_check(knowledge, query))
+    print(f"{'enumerate':>10} {base:8.2f}s")
+
+    processes = 1
+    while processes <= 2 * (os.cpu_count() or 1):
+        result, seconds = timed(
+            lambda: parallel_check(knowledge, query, processes=processes)
+        )
+        if result != entailed:
+            raise Exception("backends disagree")
+        print(f"{processes:>10} {seconds:8.2f}s {base / seconds:6.2f}x")
+        processes *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Times every entailment backend on generated knights and knaves puzzles of
+growing size, checking that they all agree. Each backend is dropped once
+a puzzle takes it longer than BUDGET seconds.
+
+Usage: python bench_puzzles.py [--save FILE | --compare FILE] [inhabitants]
+
+--save writes the timings to FILE as a JSON baseline; --compare prints
+each timing as a multiple of the one in a baseline saved before.
+"""
+
+import json
+import random
+import sys
+import time
+
+from generator import random_puzzle
+from logic import *
+
+# Seconds a backend may take on one puzzle before larger ones are skipped
+BUDGET = 10
+
+
+def separately(backend):
+    def check(knowledge, queries):
+        return [model_check(knowledge, query, backend) for query in queries]
+    return check
+
+
+def together(backend):
+    def check(knowledge, queries):
+        return model_check_all(knowledge, queries, backend)
+    return check
+
+
+BACKENDS = {
+    "enumerate": separately("enumerate"),
+    "numpy": separately("numpy"),
+    "parallel": separately("parallel"),
+    "prune": separately("prune"),
+    "resolution": separately("resolution"),
+    "sat": separately("sat"),
+    "prune batch": together("prune"),
+    "sat batch": together("sat")
+}
+
+
+def main():
+    args = sys.argv[1:]
+    mode = path = None
+    if args[:1] in (["--save"], ["--compare"]):
+        if len(args) < 2:
+            sys.exit("Usage: python bench_puzzles.py "
+                     "[--save FILE | --compare FILE] [inhabitants]")
+        mode, path, args = args[0], args[1], args[2:]
+    largest = int(args[0]) if args else 10
+
+    baseline = {}
+    if mode == "--compare":
+        with open(path) as f:
+            baseline = json.load(f)
+
+    timings = {backend: {} for backend in BACKENDS}
+    rng = random.Random(0)
+    for n in range(2, largest + 1):
+        puzzle = random_puzzle(n, rng)
+        print(f"{n} inhabitants, {len(puzzle.symbols)} symbols")
+
+        answers = {}
+        for backend, check in BACKENDS.items():
+            if any(seconds > BUDGET for seconds in timings[backend].values()):
+                continue
+            start = time.perf_counter()
+            try:
+                answers[backend] = check(puzzle.knowledge, puzzle.symbols)
+            except ResolutionLimit:
+                print(f"    {backend:12} gave up")
+                timings[backend][str(n)] = float("inf")
+                continue
+            seconds = time.perf_counter() - start
+            timings[backend][str(n)] = seconds
+
+            line = f"    {backend:12} {seconds:9.4f}s"
+            before = baseline.get(backend, {}).get(str(n))
+            if before:
+                line += f" {seconds / before:6.2f}x baseline"
+            print(line)
+
+        if len(set(map(tuple, answers.values()))) > 1:
+            raise Exception(f"backends disagree on {n} inhabitants")
+
+        # Whatever is entailed must hold in the generator's solution
+        entailed = next(iter(answers.values()))
+        for symbol, known in zip(puzzle.symbols, entailed):
+            person, kind = symbol.name.split(" is a ")
+            if known and (kind == "Knight") != (person in puzzle.knights):
+                raise Exception(f"{symbol} entailed but false")
+
+    if mode == "--save":
+        with open(path, "w") as f:
+            json.dump(timings, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Checks that clauses survive a round trip through every format the logic
+module reads and writes: DIMACS CNF, plain and gzipped, from a list and
+from a ClauseArray, and the binary format of ClauseArray.save.
+
+Usage: python check_dimacs.py
+"""
+
+import os
+import random
+import tempfile
+
+from logic import *
+
+
+def random_clauses(rng, count, length):
+    """Returns length random clauses over count variables."""
+    return [[rng.choice((-1, 1)) * rng.randint(1, count)
+             for _ in range(rng.randint(1, 4))]
+            for _ in range(length)]
+
+
+def check(name, expected, count, clauses):
+    """Raises an exception unless clauses (a ClauseArray, or any other
+    sequence of clauses) are expected over count variables."""
+    if [list(clause) for clause in clauses] != expected:
+        raise Exception(f"{name}: clauses differ")
+    if isinstance(clauses, ClauseArray) and clauses.count != count:
+        raise Exception(f"{name}: {clauses.count} variables, not {count}")
+    print(f"    {name:28} ok")
+
+
+def main():
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for count, length in ((3, 2), (10, 40), (200, 1000)):
+            print(f"{length} clauses over {count} variables")
+            expected = random_clauses(rng, count, length)
+            highest = max(abs(literal) for clause in expected
+                          for literal in clause)
+            array = ClauseArray(expected)
+
+            for suffix in ("cnf", "cnf.gz"):
+                path = os.path.join(directory, f"list.{suffix}")
+                write_dimacs(path, expected)
+                check(f"list to {suffix}, read", expected, highest,
+                      list(read_dimacs(path)))
+                check(f"list to {suffix}, load", expected, highest,
+                      load_dimacs(path))
+
+                path = os.path.join(directory, f"array.{suffix}")
+                write_dimacs(path, array)
+                check(f"array to {suffix}, load", expected, highest,
+                      load_dimacs(path))
+
+            path = os.path.join(directory, "declared.cnf")
+            write_dimacs(path, expected, count + 5, ["unused variables"])
+            check("declared count, load", expected, count + 5,
+                  load_dimacs(path))
+
+            path = os.path.join(directory, "array.bin")
+            array.save(path)
+            check("array save, load", expected, highest,
+                  ClauseArray.load(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Solves a DIMACS CNF file with the logic module's SAT solver, or counts
+its models, printing the result in the usual DIMACS output format.
+
+Usage: python dimacs.py FILE [count]
+"""
+
+import sys
+import time
+
+from logic import *
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python dimacs.py FILE [count]")
+
+    start = time.perf_counter()
+    clauses = load_dimacs(sys.argv[1])
+    print(f"c {clauses.count} variables, {len(clauses)} clauses, "
+          f"loaded in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    if len(sys.argv) == 3 and sys.argv[2] == "count":
+        models = ModelCounter().count(clauses, range(1, clauses.count + 1))
+        print(f"c counted in {time.perf_counter() - start:.2f}s")
+        print(f"s mc {models}")
+        return
+
+    solver = Solver(clauses)
+    satisfiable = solver.solve()
+    print(f"c solved in {time.perf_counter() - start:.2f}s")
+    if not satisfiable:
+        print("s UNSATISFIABLE")
+        return
+    print("s SATISFIABLE")
+    model = solver.model
+    literals = [v if v < len(model) and model[v] else -v
+                for v in range(1, clauses.count + 1)]
+    for i in range(0, len(literals), 10):
+        print("v", " ".join(map(str, literals[i:i + 10])))
+    print("v 0")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Generates random knights and knaves puzzles with any number of
+inhabitants, encoded as in puzzle.py.
+
+Usage: python generator.py [inhabitants] [seed]
+"""
+
+import collections
+import random
+import sys
+
+from logic import *
+
+Puzzle = collections.namedtuple(
+    "Puzzle", ["knowledge", "symbols", "knights", "statements"]
+)
+
+
+def name(i):
+    """Returns the name of the i-th inhabitant: A to Z, then A1 to Z1..."""
+    letter = chr(ord("A") + i % 26)
+    return letter if i < 26 else f"{letter}{i // 26}"
+
+
+def random_statement(people, rng):
+    """
+    Returns (text, sentence, truth) for a random statement about people,
+    a list of (name, knight symbol, knave symbol, is knight).
+    """
+    x = rng.choice(people)
+    y = rng.choice([person for person in people if person is not x])
+    kind = rng.randrange(6)
+    if kind == 0:
+        text = f"{x[0]} is a knight."
+        sentence, truth = x[1], x[3]
+    elif kind == 1:
+        text = f"{x[0]} is a knave."
+        sentence, truth = x[2], not x[3]
+    elif kind == 2:
+        text = f"{x[0]} and {y[0]} are the same kind."
+        sentence = Or(And(x[1], y[1]), And(x[2], y[2]))
+        truth = x[3] == y[3]
+    elif kind == 3:
+        text = f"{x[0]} and {y[0]} are of different kinds."
+        sentence = Or(And(x[1], y[2]), And(x[2], y[1]))
+        truth = x[3] != y[3]
+    elif kind == 4:
+        text = f"{x[0]} and {y[0]} are both knaves."
+        sentence = And(x[2], y[2])
+        truth = not x[3] and not y[3]
+    else:
+        text = f"At least one of {x[0]} and {y[0]} is a knight."
+        sentence = Or(x[1], y[1])
+        truth = x[3] or y[3]
+    return text, sentence, truth
+
+
+def random_puzzle(n, rng, statements=1):
+    """
+    Returns a random puzzle with n inhabitants (at least two), each making
+    the given number of statements. Inhabitants are knights or knaves at
+    random, and each says only what their kind would say, so the puzzle
+    always has that assignment as a solution.
+    """
+    people = []
+    symbols = []
+    for i in range(n):
+        knight = Symbol(f"{name(i)} is a Knight")
+        knave = Symbol(f"{name(i)} is a Knave")
+        people.append((name(i), knight, knave, rng.random() < 0.5))
+        symbols.extend([knight, knave])
+
+    knowledge = And()
+    said = []
+    for speaker in people:
+        knowledge.add(Biconditional(speaker[2], Not(speaker[1])))
+        for _ in range(statements):
+            while True:
+                text, sentence, truth = random_statement(people, rng)
+                if truth == speaker[3]:
+                    break
+            said.append(f'{speaker[0]} says "{text}"')
+            knowledge.add(Biconditional(speaker[1], sentence))
+            knowledge.add(Biconditional(speaker[2], Not(sentence)))
+
+    knights = {person[0] for person in people if person[3]}
+    return Puzzle(knowledge, symbols, knights, said)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    puzzle = random_puzzle(n, random.Random(seed))
+    for line in puzzle.statements:
+        print(line)
+    print("Entailed:")
+    entailed = model_check_all(puzzle.knowledge, puzzle.symbols)
+    for symbol, known in zip(puzzle.symbols, entailed):
+        if known:
+            print(f"    {symbol}")
+
+
+if __name__ == "__main__":
+    main()
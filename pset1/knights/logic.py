@@ -1,24 +1,77 @@
+import array
+import collections
+import fractions
+import functools
+import heapq
 import itertools
+import weakref
 
 
 class Sentence():
+    """Base class of logical sentences.
+
+    Sentences are immutable and hash-consed: constructing a sentence equal
+    to one that already exists returns the existing object, so equality is
+    identity, and every node keeps its hash and symbol set precomputed.
+    The one exception is a conjunction grown with And.add, which may equal
+    a conjunction constructed before it; see And.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Every live sentence, keyed by its class and operands
+    interned = weakref.WeakValueDictionary()
+
+    @classmethod
+    def intern(cls, key, fields, symbols):
+        """Returns the sentence for key, creating it from fields if new."""
+        sentence = Sentence.interned.get(key)
+        if sentence is not None:
+            sentence.share()
+            return sentence
+        sentence = object.__new__(cls)
+        sentence.setup(key, fields, symbols)
+        Sentence.interned[key] = sentence
+        return sentence
+
+    def setup(self, key, fields, symbols):
+        for field, value in fields.items():
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, "_hash", hash(key))
+        object.__setattr__(self, "_symbols", symbols)
+
+    def share(self):
+        """Marks this sentence as referenced from more than one place."""
+
+    def __setattr__(self, name, value):
+        raise AttributeError("sentences are immutable")
+
+    def __hash__(self):
+        return self._hash
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """Evaluates the logical sentence in a model that may leave symbols
+        unassigned, returning True, False, or None if the value depends on
+        the unassigned symbols."""
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return self._symbols
 
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
             raise TypeError("must be a logical sentence")
+        sentence.share()
 
     @classmethod
     def parenthesize(cls, s):
@@ -44,14 +97,13 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        return cls.intern(("symbol", name), {"name": name}, frozenset([name]))
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __reduce__(self):
+        return (Symbol, (self.name,))
 
     def __repr__(self):
         return self.name
@@ -62,23 +114,25 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.intern(("not", operand), {"operand": operand},
+                          operand.symbols())
+
+    def __reduce__(self):
+        return (Not, (self.operand,))
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +140,71 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+    """Conjunction of sentences.
+
+    And() with no conjuncts is never shared, so it can be grown into a
+    knowledge base with add(). add() also works on any other conjunction
+    until it has been constructed a second time or used inside another
+    sentence, at which point it is shared and immutable.
+
+    A conjunction being grown keeps its conjuncts in a list and its
+    symbols in a set, so add() takes constant time; the tuple of
+    conjuncts, the symbol frozenset and the hash are rebuilt only when
+    next asked for. Once shared, a grown conjunction is the one
+    constructing an equal conjunction returns, but an equal conjunction
+    constructed before it was grown stays a separate object.
+    """
+
+    __slots__ = ("_conjuncts", "_items", "_names", "_shared")
+
+    def __new__(cls, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+        fields = {"_conjuncts": conjuncts, "_items": None, "_names": None,
+                  "_shared": False}
+        symbols = frozenset().union(
+            *[conjunct.symbols() for conjunct in conjuncts]
+        )
+        if not conjuncts:
+            sentence = object.__new__(cls)
+            sentence.setup(("and", conjuncts), fields, symbols)
+            return sentence
+        return cls.intern(("and", conjuncts), fields, symbols)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    def __reduce__(self):
+        return (And, self.conjuncts)
+
+    @property
+    def conjuncts(self):
+        if self._conjuncts is None:
+            object.__setattr__(self, "_conjuncts", tuple(self._items))
+        return self._conjuncts
+
+    def symbols(self):
+        if self._symbols is None:
+            object.__setattr__(self, "_symbols", frozenset(self._names))
+        return self._symbols
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(("and", self.conjuncts)))
+        return self._hash
+
+    def share(self):
+        # A grown conjunction is frozen, and stands for its key from now
+        # on, in place of any equal conjunction constructed before
+        if not self._shared and self._items is not None:
+            Sentence.interned[("and", self.conjuncts)] = self
+        object.__setattr__(self, "_shared", True)
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +213,63 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        if self._shared:
+            raise TypeError(
+                "cannot add to a shared conjunction: an equal conjunction "
+                "was also constructed elsewhere, or this one is used "
+                "inside another sentence; grow one from And() instead"
+            )
         Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+
+        # On the first add, the grown conjunction no longer stands for
+        # its old key, and switches to a list and a set
+        if self._items is None:
+            key = ("and", self._conjuncts)
+            if Sentence.interned.get(key) is self:
+                del Sentence.interned[key]
+            object.__setattr__(self, "_items", list(self._conjuncts))
+            object.__setattr__(self, "_names", set(self._symbols))
+        self._items.append(conjunct)
+        self._names.update(conjunct.symbols())
+        object.__setattr__(self, "_conjuncts", None)
+        object.__setattr__(self, "_symbols", None)
+        object.__setattr__(self, "_hash", None)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    __slots__ = ("disjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+    def __new__(cls, *disjuncts):
+        for disjunct in disjuncts:
+            Sentence.validate(disjunct)
+        symbols = frozenset().union(
+            *[disjunct.symbols() for disjunct in disjuncts]
         )
+        return cls.intern(("or", disjuncts), {"disjuncts": disjuncts},
+                          symbols)
+
+    def __reduce__(self):
+        return (Or, self.disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +278,36 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            if value is None:
+                result = None
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
+        return cls.intern(("implies", antecedent, consequent),
+                          {"antecedent": antecedent, "consequent": consequent},
+                          antecedent.symbols() | consequent.symbols())
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,81 +316,1662 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        if antecedent is None or consequent is None:
+            return None
+        return False
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return cls.intern(("biconditional", left, right),
+                          {"left": left, "right": right},
+                          left.symbols() | right.symbols())
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        left = self.left.evaluate(model)
+        return left == self.right.evaluate(model)
+
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+# Subexpressions nested deeper than this are compiled into their own
+# function, keeping generated code within the parser's nesting limit
+MAX_NESTING = 40
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_sentence(sentence, symbols):
+    """Returns a function evaluating sentence on a sequence of booleans.
+
+    symbols is a tuple of symbol names giving the position of each symbol
+    in the sequence. Compiled functions are cached, so checking many
+    queries against one knowledge base compiles it only once.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    functions = {}
+
+    def emit(sentence):
+        """Returns (source, nesting) of an expression over m."""
+        if isinstance(sentence, Symbol):
+            try:
+                return f"m[{index[sentence.name]}]", 0
+            except KeyError:
+                raise Exception(f"variable {sentence.name} not in model")
+        elif isinstance(sentence, Not):
+            operand, nesting = emit(sentence.operand)
+            source = f"(not {operand})"
+        elif isinstance(sentence, And):
+            if not sentence.conjuncts:
+                return "True", 0
+            operands = [emit(conjunct) for conjunct in sentence.conjuncts]
+            source = "(" + " and ".join(code for code, _ in operands) + ")"
+            nesting = max(n for _, n in operands)
+        elif isinstance(sentence, Or):
+            if not sentence.disjuncts:
+                return "False", 0
+            operands = [emit(disjunct) for disjunct in sentence.disjuncts]
+            source = "(" + " or ".join(code for code, _ in operands) + ")"
+            nesting = max(n for _, n in operands)
+        elif isinstance(sentence, Implication):
+            antecedent, n1 = emit(sentence.antecedent)
+            consequent, n2 = emit(sentence.consequent)
+            source = f"((not {antecedent}) or {consequent})"
+            nesting = max(n1, n2)
+        elif isinstance(sentence, Biconditional):
+            left, n1 = emit(sentence.left)
+            right, n2 = emit(sentence.right)
+            source = f"({left} == {right})"
+            nesting = max(n1, n2)
+        else:
+            raise TypeError("must be a logical sentence")
 
-        # If model has an assignment for each symbol
-        if not symbols:
+        if nesting + 1 < MAX_NESTING:
+            return source, nesting + 1
+
+        # Hoist the subexpression into a function of its own
+        name = f"f{len(functions)}"
+        functions[name] = eval(f"lambda m: {source}", dict(functions))
+        return f"{name}(m)", 1
+
+    source, _ = emit(sentence)
+    return eval(f"lambda m: {source}", dict(functions))
+
+
+def constant(sentence):
+    """Returns True or False if sentence is the empty And or Or, else
+    None."""
+    if isinstance(sentence, And) and not sentence.conjuncts:
+        return True
+    if isinstance(sentence, Or) and not sentence.disjuncts:
+        return False
+    return None
+
+
+def negate(sentence):
+    """Returns the negation of sentence, removing a double negation."""
+    value = constant(sentence)
+    if value is not None:
+        return Or() if value else And()
+    if isinstance(sentence, Not):
+        return sentence.operand
+    return Not(sentence)
+
+
+def simplify(sentence, model=None):
+    """Returns a sentence equivalent to sentence where the symbols in model
+    (a dict) take their values there.
+
+    Nested conjunctions and disjunctions are flattened and their
+    duplicate operands removed; constants (the empty And for true, the
+    empty Or for false) and double negations are folded away; and
+    biconditionals are written with negations moved outside and operands
+    in a fixed order, so equal ones become one shared sentence.
+    """
+    model = model or {}
+    simplified = {}
+
+    def operands(sentence, kind, identity):
+        """Returns the simplified, flattened and deduplicated operands of a
+        conjunction (or disjunction), or None if one is the absorbing
+        constant."""
+        result = dict()
+        pending = list(reversed(sentence.conjuncts if kind is And
+                                else sentence.disjuncts))
+        while pending:
+            operand = visit(pending.pop())
+            value = constant(operand)
+            if value == identity:
+                continue
+            if value is not None:
+                return None
+            if isinstance(operand, kind):
+                pending.extend(reversed(operand.conjuncts if kind is And
+                                        else operand.disjuncts))
+            elif negate(operand) in result:
+                return None
+            else:
+                result[operand] = True
+        return list(result)
+
+    def visit(sentence):
+        if sentence in simplified:
+            return simplified[sentence]
+
+        if isinstance(sentence, Symbol):
+            value = model.get(sentence.name)
+            result = (sentence if value is None
+                      else And() if value else Or())
+        elif isinstance(sentence, Not):
+            result = negate(visit(sentence.operand))
+        elif isinstance(sentence, And):
+            conjuncts = operands(sentence, And, True)
+            if conjuncts is None:
+                result = Or()
+            elif len(conjuncts) == 1:
+                result = conjuncts[0]
+            elif conjuncts == list(sentence.conjuncts):
+                # Reconstructing it would share a knowledge base still
+                # being built
+                result = sentence
+            else:
+                result = And(*conjuncts)
+        elif isinstance(sentence, Or):
+            disjuncts = operands(sentence, Or, False)
+            if disjuncts is None:
+                result = And()
+            elif len(disjuncts) == 1:
+                result = disjuncts[0]
+            else:
+                result = Or(*disjuncts)
+        elif isinstance(sentence, Implication):
+            result = visit(Or(Not(sentence.antecedent), sentence.consequent))
+            if isinstance(result, Or) and len(result.disjuncts) == 2:
+                antecedent, consequent = result.disjuncts
+                result = Implication(negate(antecedent), consequent)
+        elif isinstance(sentence, Biconditional):
+            left = visit(sentence.left)
+            right = visit(sentence.right)
+            positive = True
+            if isinstance(left, Not):
+                left, positive = left.operand, not positive
+            if isinstance(right, Not):
+                right, positive = right.operand, not positive
+            if constant(left) is not None:
+                result = right if constant(left) == positive else negate(right)
+            elif constant(right) is not None:
+                result = left if constant(right) == positive else negate(left)
+            elif left is right:
+                result = And() if positive else Or()
+            else:
+                if right.formula() < left.formula():
+                    left, right = right, left
+                result = Biconditional(left, right)
+                if not positive:
+                    result = Not(result)
+        else:
+            raise TypeError("must be a logical sentence")
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
+        simplified[sentence] = result
+        return result
+
+    return visit(sentence)
+
+
+@functools.lru_cache(maxsize=1024)
+def simplify_knowledge(knowledge):
+    """Returns (sentence, model) where sentence is knowledge simplified and
+    model holds the values of the symbols it fixes.
+
+    Conjuncts that are a symbol or its negation fix that symbol's value,
+    which is propagated into the other conjuncts until no more are fixed.
+    The fixed symbols are kept as literals at the front of sentence.
+    """
+    model = {}
+    sentence = simplify(knowledge)
+    if constant(sentence) is False:
+        return sentence, model
+    initial = (sentence.conjuncts if isinstance(sentence, And)
+               else (sentence,))
+
+    # Conjuncts containing each symbol, revisited only once it is fixed,
+    # and the values of unit conjuncts not yet propagated
+    conjuncts = []
+    occurrences = collections.defaultdict(list)
+    units = collections.deque()
+
+    def unit(conjunct):
+        if isinstance(conjunct, Symbol):
+            units.append((conjunct.name, True))
+        elif isinstance(conjunct, Not) and isinstance(conjunct.operand,
+                                                      Symbol):
+            units.append((conjunct.operand.name, False))
+
+    def watch(conjunct):
+        for symbol in conjunct.symbols():
+            occurrences[symbol].append(len(conjuncts))
+        conjuncts.append(conjunct)
+        unit(conjunct)
+
+    for conjunct in initial:
+        watch(conjunct)
+    while units:
+        name, value = units.popleft()
+        if name in model:
+            if model[name] != value:
+                return Or(), model
+            continue
+        model[name] = value
+        for i in occurrences.pop(name, ()):
+            if conjuncts[i] is None:
+                continue
+            result = simplify(conjuncts[i], model)
+            if constant(result) is False:
+                return result, model
+            conjuncts[i] = None
+            if isinstance(result, And):
+                for conjunct in result.conjuncts:
+                    watch(conjunct)
+            elif constant(result) is None:
+                conjuncts[i] = result
+                unit(result)
+
+    # Conjuncts simplified to the same sentence are kept once
+    remaining = dict()
+    for conjunct in conjuncts:
+        if conjunct is None or conjunct in remaining:
+            continue
+        if negate(conjunct) in remaining:
+            return Or(), model
+        remaining[conjunct] = True
+
+    literals = [Symbol(name) if value else Not(Symbol(name))
+                for name, value in model.items()]
+    conjuncts = literals + list(remaining)
+    if len(conjuncts) == 1:
+        return conjuncts[0], model
+    if isinstance(knowledge, And) and conjuncts == list(knowledge.conjuncts):
+        return knowledge, model
+    return And(*conjuncts), model
+
+
+def size(sentence):
+    """Returns the number of distinct sentences within sentence."""
+    seen = set()
+    pending = [sentence]
+    while pending:
+        sentence = pending.pop()
+        if sentence in seen:
+            continue
+        seen.add(sentence)
+        if isinstance(sentence, Not):
+            pending.append(sentence.operand)
+        elif isinstance(sentence, And):
+            pending.extend(sentence.conjuncts)
+        elif isinstance(sentence, Or):
+            pending.extend(sentence.disjuncts)
+        elif isinstance(sentence, Implication):
+            pending.extend([sentence.antecedent, sentence.consequent])
+        elif isinstance(sentence, Biconditional):
+            pending.extend([sentence.left, sentence.right])
+    return len(seen)
+
+
+def presimplify(knowledge, queries, stats=None):
+    """Returns knowledge and queries simplified, with the symbols knowledge
+    fixes substituted into queries.
+
+    If stats (a dict) is given, the sizes of the sentences before and
+    after are added to stats["size before"] and stats["size after"].
+    """
+    simplified, model = simplify_knowledge(knowledge)
+    simple = [simplify(query, model) for query in queries]
+    if stats is not None:
+        for key, sentences in (("size before", [knowledge, *queries]),
+                               ("size after", [simplified, *simple])):
+            stats[key] = stats.get(key, 0) + sum(map(size, sentences))
+    return simplified, simple
+
+
+def model_check(knowledge, query, backend="prune", stats=None,
+                simplify_first=True):
+    """Checks if knowledge base entails query.
+
+    backend "enumerate" checks every model of the symbols; "prune" builds
+    models one symbol at a time and skips every model below a partial one
+    that already decides the check; "numpy" checks every model too, but
+    as boolean arrays covering many models at once; "parallel" checks
+    them in a pool of processes, each taking a slice; "sat" converts
+    knowledge and the negated query to CNF and decides entailment as
+    unsatisfiability with a CDCL solver; "resolution" refutes the same
+    CNF by resolution.
+
+    For the model-enumerating backends, knowledge is first split into
+    components that share no symbols, and only the components sharing
+    symbols with query are checked against it; the rest need only be
+    satisfiable. If stats (a dict) is given, those backends count the
+    models they visit in stats["models"].
+
+    Unless simplify_first is false, knowledge and query are passed
+    through presimplify before any backend sees them.
+    """
+    if simplify_first:
+        knowledge, (query,) = presimplify(knowledge, [query], stats)
+
+    if backend == "sat":
+        cnf = CNF()
+        cnf.add(knowledge)
+        cnf.add(Not(query))
+        return not Solver(cnf.clauses).solve()
+    elif backend == "resolution":
+        return resolution_check(knowledge, query, stats)
+    elif backend not in CHECKS:
+        raise ValueError(f"unknown backend {backend}")
+    check = CHECKS[backend]
+
+    parts = components(knowledge)
+    if len(parts) == 1:
+        return check(knowledge, query, stats)
+
+    relevant = [part for part in parts if part.symbols() & query.symbols()]
+    others = [part for part in parts if not part.symbols() & query.symbols()]
+    if check(And(*relevant), query, stats):
+        return True
+
+    # Otherwise query only follows if knowledge base is unsatisfiable
+    return any(check(part, Or(), stats) for part in others)
+
+
+def components(knowledge):
+    """Returns the conjuncts of knowledge grouped into conjunctions that
+    share no symbols with each other."""
+
+    # Flatten nested conjunctions
+    conjuncts = []
+    pending = [knowledge]
+    while pending:
+        sentence = pending.pop()
+        if isinstance(sentence, And):
+            pending.extend(reversed(sentence.conjuncts))
+        else:
+            conjuncts.append(sentence)
+
+    # Union symbols that appear in the same conjunct
+    parents = {}
+
+    def find(symbol):
+        root = symbol
+        while parents.get(root, root) != root:
+            root = parents[root]
+        while symbol != root:
+            parents[symbol], symbol = root, parents[symbol]
+        return root
+
+    for conjunct in conjuncts:
+        symbols = iter(conjunct.symbols())
+        first = find(next(symbols, None))
+        for symbol in symbols:
+            root = find(symbol)
+            if root != first:
+                parents[root] = first
+
+    groups = {}
+    for conjunct in conjuncts:
+        symbol = next(iter(conjunct.symbols()), None)
+        key = conjunct if symbol is None else find(symbol)
+        groups.setdefault(key, []).append(conjunct)
+    if len(groups) <= 1:
+        return [knowledge]
+    return [And(*group) for group in groups.values()]
+
+
+def enumerate_check(knowledge, query, stats=None):
+    """Checks if knowledge base entails query by evaluating compiled
+    sentences in every model."""
+
+    # Get all symbols in both knowledge and query, in a fixed order
+    symbols = tuple(sorted(knowledge.symbols() | query.symbols()))
+    knowledge = compile_sentence(knowledge, symbols)
+    query = compile_sentence(query, symbols)
+
+    # Query must be true in every model where knowledge base is true
+    models = itertools.product((True, False), repeat=len(symbols))
+    for count, model in enumerate(models, 1):
+        if knowledge(model) and not query(model):
+            break
+    else:
+        count = None
+
+    if stats is not None:
+        stats["models"] = stats.get("models", 0) + (count or 2 ** len(symbols))
+    return count is None
+
+
+def ordered_symbols(knowledge, queries):
+    """Returns the symbols of knowledge and queries, those appearing in the
+    most conjuncts of knowledge (or queries) first."""
+    conjuncts = (knowledge.conjuncts if isinstance(knowledge, And)
+                 else (knowledge,))
+    uses = collections.Counter()
+    for sentence in conjuncts + tuple(queries):
+        uses.update(sentence.symbols())
+    return sorted(uses, key=lambda symbol: (-uses[symbol], symbol))
+
+
+def partial_check(knowledge, query, stats=None):
+    """Checks if knowledge base entails query, pruning partial models.
+
+    Symbols are assigned one at a time, those in the most conjuncts of
+    knowledge first. Below a partial model where knowledge is already
+    false or query already true, entailment holds in every model, so the
+    whole subtree is skipped; where knowledge is true and query false, a
+    counter-model has been found.
+    """
+    symbols = ordered_symbols(knowledge, [query])
+    model = dict()
+
+    def check_all(index):
+        """Checks entailment in every model extending model."""
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + 1
+
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            return True
+        holds = query.evaluate_partial(model)
+        if holds is True:
             return True
+        if known is True and holds is False:
+            return False
+
+        # Ensure entailment holds with the next symbol true and false
+        p = symbols[index]
+        for value in (True, False):
+            model[p] = value
+            if not check_all(index + 1):
+                del model[p]
+                return False
+        del model[p]
+        return True
+
+    return check_all(0)
+
+
+def model_check_all(knowledge, queries, backend="prune", stats=None,
+                    simplify_first=True):
+    """Checks which of queries knowledge base entails, at once.
+
+    Returns a list of booleans in the order of queries. Backend "prune"
+    searches the models of knowledge once, as partial_check does, and
+    keeps only the queries not yet refuted; "sat" converts knowledge to
+    CNF once and asks the same solver about each negated query as an
+    assumption, reusing what it learned for earlier queries. Sentences
+    are simplified first as in model_check.
+    """
+    queries = list(queries)
+    if simplify_first:
+        knowledge, queries = presimplify(knowledge, queries, stats)
+    if backend == "sat":
+        cnf = CNF()
+        cnf.add(knowledge)
+        literals = [cnf.literal(query) for query in queries]
+        solver = Solver(cnf.clauses)
+        return [not solver.solve([-literal]) for literal in literals]
+    elif backend != "prune":
+        raise ValueError(f"unknown backend {backend}")
+
+    # Order by knowledge alone, so no one query skews the search
+    symbols = ordered_symbols(knowledge, [])
+    extra = frozenset().union(*[query.symbols() for query in queries])
+    symbols += sorted(extra.difference(symbols))
+    entailed = [True] * len(queries)
+    model = dict()
+
+    def check_all(index, pending):
+        """Refutes the pending queries false in a model extending model."""
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + 1
+
+        known = knowledge.evaluate_partial(model)
+        if known is False:
+            return
+
+        # Queries already true below this model need no more checking
+        undecided = []
+        for i in pending:
+            if not entailed[i]:
+                continue
+            holds = queries[i].evaluate_partial(model)
+            if holds is False and known is True:
+                entailed[i] = False
+            elif holds is not True:
+                undecided.append(i)
+        if not undecided:
+            return
+
+        p = symbols[index]
+        for value in (True, False):
+            model[p] = value
+            check_all(index + 1, undecided)
+        del model[p]
+
+    check_all(0, list(range(len(queries))))
+    return entailed
+
+
+# Number of models evaluated together by vector_check
+CHUNK = 1 << 16
+
+
+def vector_check(knowledge, query, stats=None, chunk=CHUNK):
+    """Checks if knowledge base entails query, with NumPy truth tables.
+
+    Models are numbered so that bit i of the model number is the value of
+    the i-th symbol. Each chunk of models is evaluated with one boolean
+    array per distinct sentence node, so memory stays bounded by the
+    chunk size however many symbols there are.
+    """
+    import numpy as np
+
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    total = 1 << len(symbols)
+
+    for base in range(0, total, chunk):
+        # The last chunk may be shorter, if chunk does not divide total
+        size = min(chunk, total - base)
+        numbers = np.arange(base, base + size, dtype=np.int64)
+        columns = {}
+        for i, symbol in enumerate(symbols):
+            columns[symbol] = ((numbers >> i) & 1).astype(bool)
+
+        values = {}
+
+        def vector(sentence):
+            """Returns the values of sentence in every model of the chunk."""
+            if isinstance(sentence, Symbol):
+                return columns[sentence.name]
+            if sentence in values:
+                return values[sentence]
+
+            if isinstance(sentence, Not):
+                value = ~vector(sentence.operand)
+            elif isinstance(sentence, And):
+                value = np.ones(size, dtype=bool)
+                for conjunct in sentence.conjuncts:
+                    value &= vector(conjunct)
+            elif isinstance(sentence, Or):
+                value = np.zeros(size, dtype=bool)
+                for disjunct in sentence.disjuncts:
+                    value |= vector(disjunct)
+            elif isinstance(sentence, Implication):
+                value = ~vector(sentence.antecedent)
+                value |= vector(sentence.consequent)
+            elif isinstance(sentence, Biconditional):
+                value = vector(sentence.left) == vector(sentence.right)
+            else:
+                raise TypeError("must be a logical sentence")
+
+            values[sentence] = value
+            return value
+
+        if stats is not None:
+            stats["models"] = stats.get("models", 0) + size
+
+        # A model of knowledge base where query is false refutes entailment
+        if (vector(knowledge) & ~vector(query)).any():
+            return False
+    return True
+
+
+# Models each parallel_check job evaluates between checks for a stop
+BLOCK = 1 << 12
+
+# State of a parallel_check worker process, set up by start_worker
+worker = {}
+
+
+def start_worker(knowledge, query, stop):
+    """Compiles knowledge and query once in a new worker process."""
+    symbols = tuple(sorted(knowledge.symbols() | query.symbols()))
+    worker["knowledge"] = compile_sentence(knowledge, symbols)
+    worker["query"] = compile_sentence(query, symbols)
+    worker["symbols"] = symbols
+    worker["stop"] = stop
+
+
+def enumerate_job(fixed):
+    """Checks entailment in every model starting with the values fixed.
+
+    Returns (result, models checked), where result is None if another
+    job found a counter-model first.
+    """
+    knowledge, query = worker["knowledge"], worker["query"]
+    stop = worker["stop"]
+    free = len(worker["symbols"]) - len(fixed)
+    inner = min(free, BLOCK.bit_length() - 1)
+    count = 0
+    for outer in itertools.product((True, False), repeat=free - inner):
+        if stop.is_set():
+            return None, count
+        prefix = fixed + outer
+        for rest in itertools.product((True, False), repeat=inner):
+            model = prefix + rest
+            if knowledge(model) and not query(model):
+                stop.set()
+                return False, count
+        count += 1 << inner
+    return True, count
+
+
+def parallel_check(knowledge, query, stats=None, processes=None, split=None):
+    """Checks if knowledge base entails query, enumerating models in a
+    pool of processes.
+
+    The values of the first split symbols are fixed in each of 2**split
+    jobs, by default enough for four jobs per process. Once any job finds
+    a counter-model, the others stop at their next block of models and
+    jobs not yet started are cancelled. Starting the processes costs far
+    more than small knowledge bases take to check in one.
+    """
+    import concurrent.futures
+    import multiprocessing
+    import os
+
+    symbols = knowledge.symbols() | query.symbols()
+    processes = processes or os.cpu_count() or 1
+    if split is None:
+        split = (4 * processes - 1).bit_length()
+    split = min(split, len(symbols))
+
+    stop = multiprocessing.Event()
+    entailed = True
+    with concurrent.futures.ProcessPoolExecutor(
+        processes, initializer=start_worker,
+        initargs=(knowledge, query, stop)
+    ) as executor:
+        jobs = [executor.submit(enumerate_job, fixed) for fixed in
+                itertools.product((True, False), repeat=split)]
+        for job in concurrent.futures.as_completed(jobs):
+            if job.cancelled():
+                continue
+            result, count = job.result()
+            if stats is not None:
+                stats["models"] = stats.get("models", 0) + count
+            if result is False:
+                entailed = False
+                for other in jobs:
+                    other.cancel()
+    return entailed
+
+
+# Model-enumerating backends of model_check
+CHECKS = {
+    "enumerate": enumerate_check,
+    "prune": partial_check,
+    "numpy": vector_check,
+    "parallel": parallel_check
+}
+
+
+class CNF():
+    """Conjunctive normal form of sentences, as lists of integer literals.
+
+    Symbols are numbered from 1 in the order they are met; literal -v is
+    the negation of variable v. Compound subsentences get a fresh variable
+    defined to be equivalent to them (the Tseitin transformation), so the
+    CNF grows linearly with the sentences and every model of the symbols
+    extends to exactly one model of the CNF.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.count = 0
+        self.clauses = []
+        self.definitions = {}
+
+    def variable(self, name):
+        """Returns the variable number of the symbol called name."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+        return self.variables[name]
+
+    def fresh(self):
+        """Returns a new variable that stands for no symbol."""
+        self.count += 1
+        return self.count
+
+    def add(self, sentence):
+        """Adds clauses asserting that sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
         else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to sentence, defining it if needed."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            operands = [self.literal(c) for c in sentence.conjuncts]
+            x = self.fresh()
+            for operand in operands:
+                self.clauses.append([-x, operand])
+            self.clauses.append([x] + [-operand for operand in operands])
+        elif isinstance(sentence, Or):
+            operands = [self.literal(d) for d in sentence.disjuncts]
+            x = self.fresh()
+            for operand in operands:
+                self.clauses.append([x, -operand])
+            self.clauses.append([-x] + operands)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            x = self.fresh()
+            self.clauses.extend([[-x, -a, b], [x, a], [x, -b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.fresh()
+            self.clauses.extend([[-x, -a, b], [-x, a, -b],
+                                 [x, a, b], [x, -a, -b]])
+        else:
+            raise TypeError("must be a logical sentence")
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+        self.definitions[sentence] = x
+        return x
+
+
+class ClauseArray():
+    """Clauses stored end to end in one array of integer literals.
+
+    Each clause is ended by a 0, as in DIMACS, so a literal takes four
+    bytes rather than a list per clause. Iterating gives each clause as a
+    list, so a ClauseArray can be passed wherever clauses are expected,
+    such as to Solver, Resolver or ModelCounter.count.
+    """
+
+    def __init__(self, clauses=()):
+        self.literals = array.array("i")
+        self.count = 0
+        self.length = 0
+        for clause in clauses:
+            self.append(clause)
+
+    def append(self, clause):
+        clause = list(clause)
+        if 0 in clause:
+            raise ValueError("0 is not a literal")
+        self.literals.extend(clause)
+        self.literals.append(0)
+        self.count = max(self.count, *map(abs, clause), 0)
+        self.length += 1
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        clause = []
+        for literal in self.literals:
+            if literal:
+                clause.append(literal)
+            else:
+                yield clause
+                clause = []
+
+    def save(self, path):
+        """Writes the clauses to path in a binary format of native ints:
+        the number of variables and of clauses, then the literals."""
+        with open(path, "wb") as file:
+            array.array("i", [self.count, self.length]).tofile(file)
+            self.literals.tofile(file)
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    @classmethod
+    def load(cls, path):
+        """Reads clauses written by save."""
+        clauses = cls()
+        with open(path, "rb") as file:
+            header = array.array("i")
+            header.fromfile(file, 2)
+            clauses.count, clauses.length = header
+            clauses.literals.frombytes(file.read())
+        return clauses
+
+
+def open_text(path, mode="r"):
+    """Opens path as text, compressed with gzip if it ends in .gz."""
+    if str(path).endswith(".gz"):
+        import gzip
+        return gzip.open(path, mode + "t")
+    return open(path, mode)
+
+
+def dimacs_lines(path):
+    """Yields the number of variables in the header of a DIMACS CNF file,
+    then the literals on each line after it, reading one line at a time."""
+    with open_text(path) as file:
+        header = False
+        for line in file:
+            tokens = line.split()
+            if not tokens or tokens[0] == "c":
+                continue
+            if tokens[0] == "p":
+                if header or tokens[1:2] != ["cnf"] or len(tokens) != 4:
+                    raise ValueError(f"bad DIMACS header {line.strip()}")
+                header = True
+                yield int(tokens[2])
+            elif tokens[0] == "%":
+                break
+            elif not header:
+                raise ValueError("clauses before DIMACS header")
+            else:
+                yield list(map(int, tokens))
+        if not header:
+            raise ValueError("no DIMACS header")
+
+
+def read_dimacs(path):
+    """Yields the clauses of a DIMACS CNF file as lists, one at a time."""
+    lines = dimacs_lines(path)
+    next(lines)
+    clause = []
+    for line in lines:
+        for literal in line:
+            if literal:
+                clause.append(literal)
+            else:
+                yield clause
+                clause = []
+    if clause:
+        yield clause
+
+
+def load_dimacs(path):
+    """Returns the clauses of a DIMACS CNF file as a ClauseArray, counting
+    every variable the header declares, used or not."""
+    lines = dimacs_lines(path)
+    count = next(lines)
+    clauses = ClauseArray()
+    literals = clauses.literals
+    for line in lines:
+        literals.extend(line)
+    if literals and literals[-1] != 0:
+        literals.append(0)
+    clauses.length = literals.count(0)
+    if literals:
+        count = max(count, max(literals), -min(literals))
+    clauses.count = count
+    return clauses
+
+
+def write_dimacs(path, clauses, count=None, comments=()):
+    """Writes clauses (a ClauseArray or any other sequence) to path as
+    DIMACS CNF, one clause a line, with count variables (by default the
+    count of a ClauseArray, or the highest variable used) and a comment
+    line for each of comments."""
+    if count is None and isinstance(clauses, ClauseArray):
+        count = clauses.count
+    if count is None:
+        count = max((abs(literal) for clause in clauses
+                     for literal in clause), default=0)
+    with open_text(path, "w") as file:
+        for comment in comments:
+            file.write(f"c {comment}\n")
+        file.write(f"p cnf {count} {len(clauses)}\n")
+        for clause in clauses:
+            file.write(" ".join(map(str, clause)) + " 0\n")
+
+
+def save_cnf(path, cnf):
+    """Writes cnf to path as DIMACS CNF, naming the variable of each
+    symbol in a comment line."""
+    write_dimacs(path, cnf.clauses, cnf.count,
+                 [f"{v} {name}" for name, v in cnf.variables.items()])
+
+
+class KnowledgeBase():
+    """Knowledge base that can be told sentences and asked queries in turn.
+
+    Sentences are converted to CNF once, when added, and kept in a single
+    SAT solver together with every clause it learns, so queries after
+    further add() calls do not start over. Queries may be asked under
+    temporary assumptions, which are not added to the knowledge base.
+    """
+
+    def __init__(self, *sentences):
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.sentences = []
+        self.loaded = 0
+        self.entailed = set()
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.cnf.add(sentence)
+        self.load()
+
+    def load(self):
+        """Passes clauses not yet seen by the solver on to it."""
+        for clause in self.cnf.clauses[self.loaded:]:
+            self.solver.add_clause(clause)
+        self.loaded = len(self.cnf.clauses)
+
+    def literal(self, sentence):
+        """Returns a solver literal equivalent to sentence.
+
+        Its defining clauses only name a new variable, so they are kept
+        for later queries without changing what the knowledge base says.
+        """
+        literal = self.cnf.literal(sentence)
+        self.load()
+        return literal
+
+    def satisfiable(self, assumptions=()):
+        """Checks if the knowledge base and assumptions can all be true."""
+        literals = [self.literal(assumption) for assumption in assumptions]
+        return self.solver.solve(literals)
+
+    def ask(self, query, assumptions=()):
+        """Checks if the knowledge base, with assumptions, entails query."""
+        if not assumptions and query in self.entailed:
+            return True
+        literals = [self.literal(assumption) for assumption in assumptions]
+        entailed = not self.solver.solve(literals + [-self.literal(query)])
+
+        # Adding sentences never takes an entailment away
+        if entailed and not assumptions:
+            self.entailed.add(query)
+        return entailed
+
+    def knowledge(self):
+        """Returns the knowledge base as a single conjunction."""
+        return And(*self.sentences)
+
+
+# Most resolvents resolution_check generates before giving up
+RESOLUTION_LIMIT = 100000
+
+
+class ResolutionLimit(Exception):
+    """Raised when resolution generates more clauses than its limit."""
+
+
+def resolution_check(knowledge, query, stats=None, limit=RESOLUTION_LIMIT):
+    """Checks if knowledge base entails query by resolution refutation.
+
+    Derives the empty clause from the CNF of knowledge and the negated
+    query, or saturates without it. If stats (a dict) is given, the
+    Resolver's clause counts are added to it.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    resolver = Resolver(cnf.clauses, limit)
+    try:
+        return resolver.refute()
+    finally:
+        if stats is not None:
+            for key, value in resolver.counts().items():
+                stats[key] = stats.get(key, 0) + value
+
+
+class Resolver():
+    """Given-clause resolution prover over integer-literal clauses.
+
+    Clauses wait in a queue ordered by length, so units are resolved on
+    first. Each one taken from the queue is dropped if an active clause
+    subsumes it, removes the active clauses it subsumes, is resolved with
+    the active clauses it clashes with, then becomes active itself.
+    Active clauses are indexed by literal, which finds both resolution
+    partners and subsumption candidates.
+
+    Resolution is ordered: two clauses are only resolved on literals of
+    their highest variable, unless one of them is a unit. This stays
+    complete and keeps satisfiable clause sets from saturating into
+    every possible resolvent, and since CNF numbers Tseitin variables
+    after their operands, it resolves away definitions first.
+    """
+
+    def __init__(self, clauses, limit=RESOLUTION_LIMIT):
+        self.limit = limit
+        self.active = {}
+        self.index = collections.defaultdict(set)
+        self.queue = []
+        self.next = 0
+
+        # Counters for instrumentation
+        self.generated = 0
+        self.tautologies = 0
+        self.subsumed = 0
+        self.removed = 0
+
+        for clause in clauses:
+            self.push(frozenset(clause))
+
+    def counts(self):
+        return {
+            "generated": self.generated,
+            "tautologies": self.tautologies,
+            "subsumed": self.subsumed,
+            "removed": self.removed,
+            "active": len(self.active)
+        }
+
+    def push(self, clause):
+        """Queues clause unless it is a tautology or subsumed."""
+        if any(-literal in clause for literal in clause):
+            self.tautologies += 1
+        elif self.is_subsumed(clause):
+            self.subsumed += 1
+        else:
+            heapq.heappush(self.queue, (len(clause), self.next, clause))
+            self.next += 1
+
+    def is_subsumed(self, clause):
+        """Checks if some active clause is a subset of clause."""
+        hits = collections.Counter()
+        for literal in clause:
+            for i in self.index[literal]:
+                hits[i] += 1
+                if hits[i] == len(self.active[i]):
+                    return True
+        return False
+
+    def remove_subsumed(self, clause):
+        """Removes the active clauses that clause is a subset of."""
+        literals = sorted(clause, key=lambda literal: len(self.index[literal]))
+        candidates = set(self.index[literals[0]])
+        for literal in literals[1:]:
+            if not candidates:
+                break
+            candidates &= self.index[literal]
+        for i in candidates:
+            for literal in self.active.pop(i):
+                self.index[literal].discard(i)
+            self.removed += 1
+
+    def refute(self):
+        """Returns True if the empty clause follows from the clauses, and
+        False if they saturate without it."""
+        while self.queue:
+            _, i, clause = heapq.heappop(self.queue)
+            if not clause:
+                return True
+            if self.is_subsumed(clause):
+                self.subsumed += 1
+                continue
+            self.remove_subsumed(clause)
+
+            top = max(clause, key=abs)
+            for literal in clause:
+                for j in list(self.index[-literal]):
+                    other = self.active[j]
+                    if not (len(clause) == 1 or len(other) == 1
+                            or literal == top == -max(other, key=abs)):
+                        continue
+                    resolvent = (clause - {literal}) | (other - {-literal})
+                    self.generated += 1
+                    if not resolvent:
+                        return True
+                    if self.generated > self.limit:
+                        raise ResolutionLimit(
+                            f"more than {self.limit} resolvents"
+                        )
+                    self.push(resolvent)
+
+            self.active[i] = clause
+            for literal in clause:
+                self.index[literal].add(i)
+        return False
+
+
+def model_count(knowledge):
+    """Returns the number of models of knowledge over its symbols."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    return ModelCounter().count(cnf.clauses, range(1, cnf.count + 1))
+
+
+def probability(knowledge, query):
+    """Returns the fraction of models of knowledge in which query holds.
+
+    Both counts are taken over the symbols of knowledge and query, and
+    share one ModelCounter, so components common to both are counted
+    once.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    literal = cnf.literal(query)
+    variables = range(1, cnf.count + 1)
+    counter = ModelCounter()
+    total = counter.count(cnf.clauses, variables)
+    if total == 0:
+        raise ValueError("knowledge base has no models")
+    holds = counter.count(cnf.clauses + [[literal]], variables)
+    return fractions.Fraction(holds, total)
+
+
+class ModelCounter():
+    """Exact model counter (#SAT) over integer-literal clauses.
+
+    A DPLL search with unit propagation that multiplies out variables no
+    clause mentions, counts components sharing no variables separately
+    and caches the count of every component it has seen. Tseitin
+    variables introduced by CNF are defined by the symbols, so counts
+    of a CNF equal counts of the sentences it came from.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.decisions = 0
+        self.cache_hits = 0
+
+    def count(self, clauses, variables):
+        """Returns how many assignments to variables satisfy clauses."""
+        variables = frozenset(variables)
+        formula = set()
+        for clause in clauses:
+            literals = frozenset(clause)
+            if not literals:
+                return 0
+            if not any(-literal in literals for literal in literals):
+                formula.add(tuple(sorted(literals)))
+        return self.run(self.count_formula(list(formula), variables))
+
+    @staticmethod
+    def run(steps):
+        """Returns the count computed by steps, a generator from
+        count_formula or count_component.
+
+        Each generator yields the generator of every count it needs and
+        is sent that count back, so the search is driven by an explicit
+        stack and its depth is not limited by Python's recursion limit.
+        """
+        stack = [steps]
+        result = None
+        while stack:
+            try:
+                needed = stack[-1].send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+            else:
+                stack.append(needed)
+                result = None
+        return result
+
+    def count_formula(self, clauses, variables):
+        """Counts models of clauses over variables, which include every
+        variable in clauses, as a generator for run."""
+        clauses, assigned = self.propagate(clauses)
+        if clauses is None:
+            return 0
+        components = self.split(clauses)
+        used = sum(len(component[1]) for component in components)
+        total = 1 << (len(variables) - len(assigned) - used)
+
+        for component, support in components:
+            total *= yield self.count_component(component, support)
+            if total == 0:
+                break
+        return total
+
+    def count_component(self, clauses, variables):
+        """Counts models of a component, as a generator for run."""
+        key = frozenset(clauses)
+        if key in self.cache:
+            self.cache_hits += 1
+            return self.cache[key]
+
+        # Branch on a variable in the most clauses, and of those on the
+        # middle one by number: CNF numbers symbols in order of appearance,
+        # so on a chain of sentences this splits the chain in two rather
+        # than shortening it by one
+        uses = collections.Counter(
+            abs(literal) for clause in clauses for literal in clause
+        )
+        most = max(uses.values())
+        tied = sorted(v for v in uses if uses[v] == most)
+        v = tied[len(tied) // 2]
+        variables = variables - {v}
+        self.decisions += 1
+        total = 0
+        for literal in (v, -v):
+            reduced = self.condition(clauses, {literal})
+            if reduced is not None:
+                total += yield self.count_formula(reduced, variables)
+
+        self.cache[key] = total
+        return total
+
+    @staticmethod
+    def condition(clauses, literals):
+        """Returns clauses simplified by a consistent set of literals
+        being true, or None if a clause became empty."""
+        falsified = {-literal for literal in literals}
+        result = []
+        for clause in clauses:
+            if not literals.isdisjoint(clause):
+                continue
+            if not falsified.isdisjoint(clause):
+                clause = tuple(q for q in clause if q not in falsified)
+                if not clause:
+                    return None
+            result.append(clause)
+        return result
+
+    def propagate(self, clauses):
+        """Returns (clauses, assigned variables) after unit propagation, or
+        (None, None) on a conflict.
+
+        Each clause keeps a count of its literals not yet false, found
+        through an index of the clauses containing each literal, so
+        propagation takes time linear in the size of clauses.
+        """
+        units = [clause[0] for clause in clauses if len(clause) == 1]
+        if not units:
+            return clauses, set()
+        index = collections.defaultdict(list)
+        for i, clause in enumerate(clauses):
+            for literal in clause:
+                index[literal].append(i)
+        left = [len(clause) for clause in clauses]
+        satisfied = [False] * len(clauses)
+
+        true = set()
+        while units:
+            literal = units.pop()
+            if literal in true:
+                continue
+            if -literal in true:
+                return None, None
+            true.add(literal)
+            for i in index[literal]:
+                satisfied[i] = True
+            for i in index[-literal]:
+                if satisfied[i]:
+                    continue
+                left[i] -= 1
+                if left[i] == 0:
+                    return None, None
+                if left[i] == 1:
+                    units.extend(q for q in clauses[i] if -q not in true)
+
+        clauses = [clause if left[i] == len(clause)
+                   else tuple(q for q in clause if -q not in true)
+                   for i, clause in enumerate(clauses) if not satisfied[i]]
+        return clauses, {abs(literal) for literal in true}
+
+    @staticmethod
+    def split(clauses):
+        """Returns (clauses, variables) for each component of clauses, the
+        groups of clauses sharing no variables with one another."""
+        index = collections.defaultdict(list)
+        for clause in clauses:
+            for literal in clause:
+                index[abs(literal)].append(clause)
+
+        seen = set()
+        components = []
+        for start in index:
+            if start in seen:
+                continue
+            seen.add(start)
+            component = set()
+            stack = [start]
+            while stack:
+                for clause in index[stack.pop()]:
+                    if clause in component:
+                        continue
+                    component.add(clause)
+                    for literal in clause:
+                        v = abs(literal)
+                        if v not in seen:
+                            seen.add(v)
+                            stack.append(v)
+            variables = frozenset(
+                abs(literal) for clause in component for literal in clause
+            )
+            components.append((list(component), variables))
+        return components
+
+
+def luby(i):
+    """Returns the i-th term (from 1) of the Luby restart sequence."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class Solver():
+    """CDCL SAT solver over integer-literal clauses.
+
+    Uses two watched literals per clause for unit propagation, first-UIP
+    clause learning with non-chronological backtracking, VSIDS decisions
+    with phase saving, and Luby restarts. Clauses may be added between
+    calls to solve(), and learned clauses are kept, so the solver can be
+    queried repeatedly under different assumptions.
+    """
+
+    RESTART_BASE = 100
+    DECAY = 0.95
+
+    def __init__(self, clauses=()):
+        self.count = 0
+        self.values = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.watches = {}
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.heap = []
+        self.increment = 1.0
+        self.ok = True
+        self.model = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.learned = 0
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def grow(self, count):
+        """Makes room for variables up to count."""
+        while self.count < count:
+            self.count += 1
+            self.values.append(None)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phases.append(False)
+            self.watches[self.count] = []
+            self.watches[-self.count] = []
+            heapq.heappush(self.heap, (0.0, self.count))
+
+    def value(self, literal):
+        """Returns True, False or None for the current value of literal."""
+        value = self.values[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, clause):
+        """Adds clause, returning False if the clauses became unsatisfiable."""
+        if not self.ok:
+            return False
+        self.grow(max((abs(literal) for literal in clause), default=0))
+
+        # Drop literals false at the top level, and satisfied clauses
+        literals = []
+        seen = set()
+        for literal in clause:
+            value = self.value(literal)
+            if value is True or -literal in seen:
+                return True
+            if value is None and literal not in seen:
+                seen.add(literal)
+                literals.append(literal)
+
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.enqueue(literals[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.watch(literals)
+        return self.ok
+
+    def watch(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def enqueue(self, literal, reason):
+        v = abs(literal)
+        self.values[v] = literal > 0
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Propagates assigned literals, returning a conflict clause or None."""
+        values = self.values
+        watches = self.watches
+        trail = self.trail
+        while self.head < len(trail):
+            false = -trail[self.head]
+            self.head += 1
+            self.propagations += 1
+
+            watching = watches[false]
+            watches[false] = kept = []
+            for k, clause in enumerate(watching):
+
+                # Make sure the false literal is the second watch
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                value = values[abs(first)]
+                if value is not None and value == (first > 0):
+                    kept.append(clause)
+                    continue
+
+                # Look for a new literal to watch
+                for i in range(2, len(clause)):
+                    literal = clause[i]
+                    value = values[abs(literal)]
+                    if value is None or value == (literal > 0):
+                        clause[1], clause[i] = literal, false
+                        watches[literal].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    value = values[abs(first)]
+                    if value is None:
+                        self.enqueue(first, clause)
+                    else:
+                        kept.extend(watching[k + 1:])
+                        self.head = len(trail)
+                        return clause
+        return None
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-a, u) for u, a in enumerate(self.activity) if u]
+            heapq.heapify(self.heap)
+        elif self.values[v] is None:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def analyze(self, conflict):
+        """Returns (learned clause, backtrack level) for a conflict."""
+        seen = set()
+        learned = [None]
+        level = len(self.limits)
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if literal is None else clause[1:]):
+                v = abs(q)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] >= level:
+                        pending += 1
+                    else:
+                        learned.append(q)
+
+            # Walk back to the next literal of this level in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            clause = self.reasons[abs(literal)]
+            pending -= 1
+            if pending == 0:
+                break
+            seen.discard(abs(literal))
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal of the highest remaining level second
+        best = max(range(1, len(learned)),
+                   key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[best] = learned[best], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def backtrack(self, level):
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            v = abs(literal)
+            self.values[v] = None
+            self.reasons[v] = None
+            self.phases[v] = literal > 0
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+        # Drop stale heap entries once they outnumber the variables
+        if len(self.heap) > 4 * self.count + 100:
+            self.heap = [(-self.activity[v], v)
+                         for v in range(1, self.count + 1)
+                         if self.values[v] is None]
+            heapq.heapify(self.heap)
+
+    def decide(self):
+        """Returns the unassigned variable of highest activity, or None."""
+        while self.heap:
+            _, v = heapq.heappop(self.heap)
+            if self.values[v] is None:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """Returns True if the clauses and assumptions are satisfiable.
+
+        When satisfiable, self.model holds the value of every variable,
+        indexed by variable number.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.grow(max((abs(literal) for literal in assumptions), default=0))
+
+        restarts = 0
+        budget = 0
+        try:
+            while True:
+                conflict = self.propagate()
+                if conflict is not None:
+                    self.conflicts += 1
+                    budget -= 1
+                    if not self.limits:
+                        self.ok = False
+                        return False
+                    learned, level = self.analyze(conflict)
+                    self.increment /= self.DECAY
+                    self.backtrack(level)
+                    if len(learned) == 1:
+                        self.enqueue(learned[0], None)
+                    else:
+                        self.watch(learned)
+                        self.learned += 1
+                        self.enqueue(learned[0], learned)
+                    continue
+
+                if budget <= 0 and self.limits:
+                    self.backtrack(0)
+                    restarts += 1
+                    budget = self.RESTART_BASE * luby(restarts)
+                    continue
+                if budget <= 0:
+                    budget = self.RESTART_BASE * luby(restarts + 1)
+
+                # Assumptions are decided first, one level each
+                level = len(self.limits)
+                if level < len(assumptions):
+                    literal = assumptions[level]
+                    value = self.value(literal)
+                    if value is False:
+                        return False
+                    self.limits.append(len(self.trail))
+                    if value is None:
+                        self.enqueue(literal, None)
+                    continue
+
+                v = self.decide()
+                if v is None:
+                    self.model = list(self.values)
+                    return True
+                self.decisions += 1
+                self.limits.append(len(self.trail))
+                self.enqueue(v if self.phases[v] else -v, None)
+        finally:
+            self.backtrack(0)
@@ -0,0 +1,82 @@
+"""
+Checks MinesweeperAI.mine_probabilities against brute force: on small
+seeded games, after each of the AI's first moves, every placement of the
+mines consistent with the cells revealed so far is counted, and each
+unknown cell's share of them must match the AI's probability.
+
+Usage: python check_probabilities.py [games] [height] [width] [mines]
+"""
+
+import itertools
+import random
+import sys
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Largest difference allowed between a probability and its brute force
+TOLERANCE = 1e-9
+
+
+def brute_force(game, revealed):
+    """
+    Returns the probability that each cell is a mine, over every placement
+    of game's mines agreeing with the counts of the revealed cells.
+    """
+    cells = [(i, j) for i in range(game.height) for j in range(game.width)]
+    placements = 0
+    mines = {cell: 0 for cell in cells}
+    for placement in itertools.combinations(cells, len(game.mines)):
+        placement = set(placement)
+        if placement & revealed:
+            continue
+        if all(
+            sum((i + di, j + dj) in placement
+                for di in (-1, 0, 1) for dj in (-1, 0, 1)) ==
+            game.nearby_mines((i, j))
+            for i, j in revealed
+        ):
+            placements += 1
+            for cell in placement:
+                mines[cell] += 1
+    return {cell: mines[cell] / placements for cell in cells}
+
+
+def main():
+    defaults = [30, 4, 5, 5]
+    args = [int(arg) for arg in sys.argv[1:]]
+    games, height, width, mines = args + defaults[len(args):]
+
+    worst = 0.0
+    checks = 0
+    for seed in range(games):
+        random.seed(seed)
+        game = Minesweeper(height=height, width=width, mines=mines)
+        ai = MinesweeperAI(height=height, width=width, mines=mines)
+        for _ in range(5):
+            move = ai.make_safe_move() or ai.make_random_move()
+            if move is None or game.is_mine(move):
+                break
+            ai.add_knowledge(move, game.nearby_mines(move))
+
+            unknown = list(ai.unknown)
+            if not unknown:
+                break
+            probabilities, rest = ai.mine_probabilities()
+            expected = brute_force(game, ai.moves_made)
+            for cell in unknown:
+                error = abs(probabilities.get(cell, rest) - expected[cell])
+                if error > TOLERANCE:
+                    raise Exception(
+                        f"game {seed}: cell {cell} has probability "
+                        f"{probabilities.get(cell, rest)}, not "
+                        f"{expected[cell]}"
+                    )
+                worst = max(worst, error)
+            checks += 1
+
+    print(f"{checks} positions in {games} games of {height}x{width} with "
+          f"{mines} mines, largest error {worst:.1e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import collections
 import itertools
+import math
 import random
 import copy
+import time
+
+import numpy as np
 
 
 class Minesweeper():
@@ -13,23 +18,23 @@ class Minesweeper():
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
-
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # Add mines at a random sample of cell numbers
+        cells = np.array(random.sample(range(height * width), mines),
+                         dtype=np.int64)
+        rows, columns = np.divmod(cells, width)
+        self.mines = set(zip(rows.tolist(), columns.tolist()))
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board[rows, columns] = True
+
+        # Count every cell's nearby mines at once, convolving the board
+        # with a 3x3 kernel as a sum of its eight shifts
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        self.counts = np.zeros((height, width), dtype=np.uint8)
+        for i in range(3):
+            for j in range(3):
+                if (i, j) != (1, 1):
+                    self.counts += padded[i:i + height, j:j + width]
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -51,7 +56,7 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
-        return self.board[i][j]
+        return bool(self.board[i, j])
 
     def nearby_mines(self, cell):
         """
@@ -59,24 +64,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return int(self.counts[i, j])
 
     def won(self):
         """
@@ -85,6 +74,19 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+def convolve(a, b):
+    """
+    Returns the distribution of the sum of mine counts from a and b, dicts
+    mapping a number of mines to the number (or weight) of ways to place
+    them.
+    """
+    result = collections.Counter()
+    for m, x in a.items():
+        for n, y in b.items():
+            result[m + n] += x * y
+    return result
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
@@ -156,16 +158,131 @@ class Sentence():
         return None
 
 
+class KnowledgeBase():
+    """
+    Collection of sentences about a Minesweeper game, indexed by cell,
+    so that marking a cell only visits the sentences that contain it.
+    Sentences with the same cells and count are only kept once.
+    """
+
+    def __init__(self):
+
+        # Sentences by id, and the sentences containing a cell by id, in
+        # dicts rather than sets so that they are visited in the order
+        # added, whatever their ids
+        self.sentences = dict()
+        self.index = dict()
+
+        # Ids of sentences by their (cells, count) key
+        self.keys = dict()
+
+    def __iter__(self):
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return self.key(sentence) in self.keys
+
+    def holds(self, sentence):
+        """
+        Returns whether this very sentence object is in the knowledge
+        base, rather than only a sentence equal to it.
+        """
+        return id(sentence) in self.sentences
+
+    @staticmethod
+    def key(sentence):
+        return (frozenset(sentence.cells), sentence.count)
+
+    def add(self, sentence):
+        """
+        Adds a sentence to the knowledge base, returning False if it has
+        no cells or an equal sentence is already known.
+        """
+        key = self.key(sentence)
+        if not sentence.cells or key in self.keys:
+            return False
+        self.sentences[id(sentence)] = sentence
+        self.keys[key] = id(sentence)
+        for cell in sentence.cells:
+            self.index.setdefault(cell, dict())[id(sentence)] = sentence
+        return True
+
+    def remove(self, sentence):
+        """
+        Removes a sentence from the knowledge base.
+        """
+        del self.sentences[id(sentence)]
+        del self.keys[self.key(sentence)]
+        for cell in sentence.cells:
+            self.unindex(cell, sentence)
+
+    def unindex(self, cell, sentence):
+        sentences = self.index[cell]
+        sentences.pop(id(sentence), None)
+        if not sentences:
+            del self.index[cell]
+
+    def containing(self, cell):
+        """
+        Returns a list of the sentences that contain cell.
+        """
+        return list(self.index.get(cell, {}).values())
+
+    def overlapping(self, sentence):
+        """
+        Returns a list of the other sentences sharing a cell with sentence.
+        """
+        sentences = dict()
+        for cell in sentence.cells:
+            sentences.update(self.index[cell])
+        sentences.pop(id(sentence), None)
+        return list(sentences.values())
+
+    def mark(self, cell, mine):
+        """
+        Marks cell as a mine (or as safe) in every sentence containing it,
+        returning the sentences still in the knowledge base that changed.
+        Sentences left with no cells, or equal to another, are removed.
+        """
+        changed = []
+        for sentence in self.containing(cell):
+            self.remove(sentence)
+            if mine:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+            if self.add(sentence):
+                changed.append(sentence)
+        return changed
+
+    def mark_mine(self, cell):
+        return self.mark(cell, True)
+
+    def mark_safe(self, cell):
+        return self.mark(cell, False)
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    # Seconds mine_probabilities may spend enumerating configurations
+    # before it falls back to estimates from single sentences, and if not
+    # None, the number of search steps it may take on one component; a
+    # step limit falls back at the same point on any machine
+    PROBABILITY_TIME = 1.0
+    PROBABILITY_STEPS = None
+
+    def __init__(self, height=8, width=8, mines=None):
 
-        # Set initial height and width
+        # Set initial height and width, and the number of mines if known
         self.height = height
         self.width = width
+        self.mine_count = mines
 
         # Keep track of which cells have been clicked on
         self.moves_made = set()
@@ -174,8 +291,35 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true
+        self.knowledge = KnowledgeBase()
+
+        # Sentences added or changed since inference last ran
+        self.worklist = collections.deque()
+
+        # Cells not yet known to be safe or mines, in a list to choose
+        # from at random, and the position of each cell in that list
+        self.unknown = [(i, j) for i in range(height) for j in range(width)]
+        self.positions = {cell: k for k, cell in enumerate(self.unknown)}
+
+        # Cells known to be safe but not yet chosen, in the order found,
+        # and the set of safe cells and how many of them were queued there
+        self.safe_moves = collections.deque()
+        self.queued_from = self.safes
+        self.queued = 0
+
+    def settle(self, cell):
+        """
+        Removes a cell from the unknown cells, by moving the last unknown
+        cell into its place.
+        """
+        k = self.positions.pop(cell, None)
+        if k is None:
+            return
+        last = self.unknown.pop()
+        if last != cell:
+            self.unknown[k] = last
+            self.positions[last] = k
 
     def mark_mine(self, cell):
         """
@@ -183,17 +327,21 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.settle(cell)
+        self.worklist.extend(self.knowledge.mark_mine(cell))
 
     def mark_safe(self, cell):
         """
         Marks a cell as safe, and updates all knowledge
         to mark that cell as safe as well.
         """
+        if cell not in self.safes:
+            self.queued += 1
+            if cell not in self.moves_made:
+                self.safe_moves.append(cell)
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.settle(cell)
+        self.worklist.extend(self.knowledge.mark_safe(cell))
 
     def add_knowledge(self, cell, count):
         """
@@ -216,7 +364,7 @@ class MinesweeperAI():
         # Mark cell as safe
         self.mark_safe(cell)
 
-        # Find neighbouring unexplored cells
+        # Find neighbouring cells not yet known to be safe or mines
         neighbours = set()
         for i in range(-1, 2):
             for j in range(-1, 2):
@@ -224,77 +372,59 @@ class MinesweeperAI():
                 next_i = cell[0] + i
                 next_j = cell[1] + j
 
-                if 0 > next_i or next_i >= self.width:
+                if 0 > next_i or next_i >= self.height:
                     continue
 
-                elif 0 > next_j or next_j >= self.height:
+                elif 0 > next_j or next_j >= self.width:
                     continue
 
+                elif (next_i, next_j) in self.mines:
+                    count -= 1
+
                 elif (next_i, next_j) not in self.safes:
                     neighbours.add((next_i, next_j))
 
-                else:
-                    continue    
-
-
         # Add new sentence to AI's knowledge base
-        new_sentence = Sentence(neighbours, count)
-        
-        self.knowledge.append(new_sentence)
-           
-
-        # Check if new cells can be marked as mines / safes
-        # self.check_knowledge
-        for sentence in self.knowledge:
-            
-            # Remove empty sentences from knowledge
-            if len(sentence.cells) == 0 and sentence.count == 0:
-                self.knowledge.remove(sentence)
-            
-            new_safes = sentence.known_safes()
-            new_mines = sentence.known_mines()
-            
-            #print(f"check sets {sentence.known_safes()}")
-            
-            
-            while not len(new_safes) == 0:
-                    
-                for new_safe in new_safes:
-                    self.mark_safe(new_safe)
-                    break
+        sentence = Sentence(neighbours, count)
+        if self.knowledge.add(sentence):
+            self.worklist.append(sentence)
 
-            
-            while not len(new_mines) == 0:
-                for new_mine in new_mines:
-                    self.mark_mine(new_mine)
-                    break
-        
-        # Identify additional sentences from inference
-        # self.infer_knowledge
-        for sentence_1 in self.knowledge:
-            for sentence_2 in self.knowledge:
+        self.infer()
 
-                # Check it is not comparing against itself
-                if sentence_1 == sentence_2 or sentence_1.count == 0 or sentence_2.count == 0: #len(sentence_1.cells) == 0 or len(sentence_2.cells) == 0 or
+    def infer(self):
+        """
+        Draws inferences from the sentences on the worklist until none
+        remain: marks cells a sentence shows to be safe or mines, and adds
+        the difference of each sentence and any sentence whose cells are a
+        subset of the other's. Marking queues every sentence it changes,
+        and new sentences are queued as they are added, so only sentences
+        touched by new facts are examined again.
+        """
+        while self.worklist:
+            sentence = self.worklist.popleft()
+            if not self.knowledge.holds(sentence):
+                continue
+
+            # Check if cells can be marked as mines / safes
+            for new_safe in list(sentence.known_safes()):
+                self.mark_safe(new_safe)
+            for new_mine in list(sentence.known_mines()):
+                self.mark_mine(new_mine)
+            if not self.knowledge.holds(sentence):
+                continue
+
+            # Infer by the subset method against overlapping sentences
+            for other in self.knowledge.overlapping(sentence):
+                if other.cells < sentence.cells:
+                    subset, superset = other, sentence
+                elif sentence.cells < other.cells:
+                    subset, superset = sentence, other
+                else:
                     continue
-
-                # If one sentence is a subset of another, infer new sentence by subset method
-                if sentence_1.cells.issubset(sentence_2.cells):
-                    new_cells = sentence_2.cells.difference(sentence_1.cells)
-                    new_count = sentence_2.count - sentence_1.count
-                    
-                    # Check whether this inference has already been added, to prevent an infinitely growing list
-                    inferred_sentence = Sentence(new_cells, new_count)
-                    match = False
-                    for sentence_3 in self.knowledge:        
-                        if inferred_sentence.cells == sentence_3.cells and inferred_sentence.count == sentence_3.count:
-                            match = True
-                            break
-
-                    if not match:
-                        self.knowledge.append(Sentence(new_cells, new_count))
-
-
+                inferred = Sentence(superset.cells - subset.cells,
+                                    superset.count - subset.count)
+                if self.knowledge.add(inferred):
+                    self.worklist.append(inferred)
 
     def make_safe_move(self):
         """
@@ -305,42 +435,306 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        
-        for safe_move in self.safes:
-
-            if safe_move not in self.moves_made:
-                return safe_move
-          
+        # If self.safes was replaced, or changed directly rather than
+        # through mark_safe, its cells are only found by going through
+        # all of them
+        if (self.safes is not self.queued_from
+                or len(self.safes) != self.queued):
+            self.safe_moves = collections.deque(
+                cell for cell in self.safes if cell not in self.moves_made
+            )
+            self.queued_from = self.safes
+            self.queued = len(self.safes)
+
+        # Drop cells chosen, or no longer known to be safe, since they
+        # were queued
+        while self.safe_moves and (self.safe_moves[0] in self.moves_made
+                                   or self.safe_moves[0] not in self.safes):
+            self.safe_moves.popleft()
+
+        if self.safe_moves:
+            return self.safe_moves[0]
         return None
 
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
-        Should choose randomly among cells that:
+        Chooses randomly among the cells least likely to be mines that:
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        possible_moves = set()
-        for i in range(self.width):
-            for j in range(self.height):
-
-                move = (i,j)
-
-                if move not in self.moves_made.union(self.mines):
-
-                    possible_moves.add(move)
-        
-        # If still random moves to make
-        try:
-            random_move = random.sample(possible_moves,1)
-            return random_move[0]
-        
-        # If no more random moves to make
-        except:
-            return None
-        
-                
-        
+        # If no cells are unknown, only known safe cells may be left
+        if not self.unknown:
+            return self.make_safe_move()
+
+        # Choose among the least risky cells of the frontier, and the cells
+        # outside it if they are no riskier
+        probabilities, rest = self.mine_probabilities()
+        free = len(self.unknown) - len(probabilities)
+        risk = min(probabilities.values(), default=1.0)
+        moves = [cell for cell in probabilities if probabilities[cell] == risk]
+        if free and (rest < risk or rest == risk and
+                     random.randrange(free + len(moves)) < free):
+            move = self.random_free_cell(probabilities)
+            if move is not None:
+                return move
+        return random.choice(moves) if moves else None
+
+    def random_free_cell(self, frontier):
+        """
+        Returns a random unknown cell not in frontier, by picking unknown
+        cells at random until one is not, so the cost does not grow with
+        the board unless the frontier holds most unknown cells. Cells
+        added to moves_made or mines directly, rather than through
+        add_knowledge or mark_mine, are dropped from the unknown cells as
+        they are picked.
+        """
+        tries = 0
+        while self.unknown and tries < 8:
+            cell = random.choice(self.unknown)
+            if cell in self.moves_made or cell in self.mines:
+                self.settle(cell)
+            elif cell not in frontier:
+                return cell
+            else:
+                tries += 1
+        moves = [cell for cell in self.unknown if cell not in frontier
+                 and cell not in self.moves_made and cell not in self.mines]
+        return random.choice(moves) if moves else None
+
+    def mine_probabilities(self):
+        """
+        Returns (probabilities, rest): a dict giving the probability that
+        each cell in a sentence is a mine, and the probability for each
+        other unknown cell, given the knowledge base, when every
+        arrangement of the remaining mines consistent with it is equally
+        likely.
+
+        Cells in sentences form the frontier, which splits into components
+        sharing no sentences. The mine configurations of each component
+        are enumerated by backtracking, then combined, weighting each
+        combination by the ways to place the remaining mines in cells no
+        sentence mentions. If the number of mines is not known, each
+        configuration counts once. A component whose enumeration takes
+        more than PROBABILITY_STEPS steps, or runs past PROBABILITY_TIME
+        seconds for all components, is estimated instead, as if it always
+        held the mines its estimates add up to.
+        """
+        deadline = time.perf_counter() + self.PROBABILITY_TIME
+        components = self.frontier_components()
+        results = []
+        for cells, sentences in components:
+            try:
+                results.append(self.configurations(
+                    cells, sentences, deadline, self.PROBABILITY_STEPS
+                ))
+            except TimeoutError:
+                results.append(self.estimate_component(cells, sentences))
+        if not all(counts for counts, _ in results):
+            return self.estimate_probabilities()
+
+        probabilities = dict()
+        for cells, _ in components:
+            for cell in cells:
+                probabilities[cell] = 0.0
+        free = len(self.unknown) - len(probabilities)
+
+        if self.mine_count is None:
+            total = 0.0
+            for (cells, _), (counts, cell_counts) in zip(components, results):
+                configurations = sum(counts.values())
+                for i, cell in enumerate(cells):
+                    mines = sum(cell_counts[k][i] for k in counts)
+                    probabilities[cell] = mines / configurations
+                    total += probabilities[cell]
+            density = total / len(probabilities) if probabilities else 0.5
+            return probabilities, density
+
+        # Scale each component's counts so the largest is 1; the scale of a
+        # component multiplies every combination alike, so it cancels out
+        scaled = []
+        for counts, cell_counts in results:
+            scale = max(counts.values())
+            scaled.append((
+                {k: n / scale for k, n in counts.items()},
+                {k: [x / scale for x in cell_counts[k]] for k in counts}
+            ))
+
+        # Weight of m mines in the frontier, over all components
+        ways = {0: 1.0}
+        for counts, _ in scaled:
+            ways = convolve(ways, counts)
+
+        # Ways to place the other mines in free cells, relative to the most
+        # ways for any m, from logarithms as the counts themselves are huge
+        remaining = self.mine_count - len(self.mines)
+        logs = dict()
+        for m in ways:
+            left = remaining - m
+            if 0 <= left <= free:
+                logs[m] = (math.lgamma(free + 1) - math.lgamma(left + 1)
+                           - math.lgamma(free - left + 1))
+        if not logs:
+            return self.estimate_probabilities()
+        top = max(logs.values())
+        weight = collections.defaultdict(float)
+        for m, log in logs.items():
+            weight[m] = math.exp(log - top)
+
+        total = sum(n * weight[m] for m, n in ways.items())
+        for c, (cells, _) in enumerate(components):
+            counts, cell_counts = scaled[c]
+            others = {0: 1.0}
+            for d, (other_counts, _) in enumerate(scaled):
+                if d != c:
+                    others = convolve(others, other_counts)
+            for k in counts:
+                rest = sum(n * weight[k + m] for m, n in others.items())
+                for i, cell in enumerate(cells):
+                    probabilities[cell] += cell_counts[k][i] * rest / total
+
+        # Each free cell holds its share of the mines left for free cells
+        share = 0.0
+        if free:
+            share = sum(n * weight[m] * (remaining - m) / free
+                        for m, n in ways.items()) / total
+        return probabilities, share
+
+    def frontier_components(self):
+        """
+        Returns (cells, sentences) for each group of sentences connected by
+        sharing cells, with the cells in the order a search reaches them.
+        """
+        components = []
+        seen = set()
+        for start in self.knowledge:
+            if id(start) in seen:
+                continue
+            seen.add(id(start))
+            cells = []
+            sentences = []
+            placed = set()
+            queue = collections.deque([start])
+            while queue:
+                sentence = queue.popleft()
+                sentences.append(sentence)
+                for cell in sorted(sentence.cells):
+                    if cell in placed:
+                        continue
+                    placed.add(cell)
+                    cells.append(cell)
+                    for other in self.knowledge.containing(cell):
+                        if id(other) not in seen:
+                            seen.add(id(other))
+                            queue.append(other)
+            components.append((cells, sentences))
+        return components
+
+    def configurations(self, cells, sentences, deadline, limit=None):
+        """
+        Enumerates the mine configurations of cells satisfying sentences,
+        returning (counts, cell_counts): counts[m] is the number with m
+        mines, and cell_counts[m][i] how many of those have a mine in
+        cells[i]. Raises TimeoutError once the deadline passes, or after
+        limit steps if limit is not None.
+
+        The search backtracks over the cells in order with an explicit
+        stack, so components of any size can be searched.
+        """
+        position = {cell: i for i, cell in enumerate(cells)}
+        constraints = [[] for cell in cells]
+        mines = [0] * len(sentences)
+        left = [len(sentence.cells) for sentence in sentences]
+        for s, sentence in enumerate(sentences):
+            for cell in sentence.cells:
+                constraints[position[cell]].append(s)
+
+        counts = collections.Counter()
+        cell_counts = dict()
+        assignment = [0] * len(cells)
+
+        # Value last tried for each cell, or -1 if none is applied
+        tried = [-1] * len(cells)
+        steps = 0
+        i = 0
+        while i >= 0:
+            steps += 1
+            if limit is not None and steps > limit:
+                raise TimeoutError
+            if steps % 1024 == 0 and time.perf_counter() > deadline:
+                raise TimeoutError
+            if i == len(cells):
+                m = sum(assignment)
+                counts[m] += 1
+                totals = cell_counts.setdefault(m, [0] * len(cells))
+                for j, value in enumerate(assignment):
+                    totals[j] += value
+                i -= 1
+                continue
+
+            # Undo the value last tried for this cell, and try the next
+            value = tried[i]
+            if value >= 0:
+                for s in constraints[i]:
+                    mines[s] -= value
+                    left[s] += 1
+            value += 1
+            if value > 1:
+                tried[i] = -1
+                assignment[i] = 0
+                i -= 1
+                continue
+
+            tried[i] = value
+            consistent = True
+            for s in constraints[i]:
+                mines[s] += value
+                left[s] -= 1
+                count = sentences[s].count
+                if mines[s] > count or mines[s] + left[s] < count:
+                    consistent = False
+            if consistent:
+                assignment[i] = value
+                i += 1
+
+        return counts, cell_counts
+
+    def estimate_component(self, cells, sentences):
+        """
+        Returns (counts, cell_counts) as configurations does for a single
+        made-up configuration: each cell holds the highest density of
+        mines among the sentences containing it, and the component the
+        nearest whole number of mines to their sum.
+        """
+        estimates = {cell: 0.0 for cell in cells}
+        for sentence in sentences:
+            density = sentence.count / len(sentence.cells)
+            for cell in sentence.cells:
+                estimates[cell] = max(estimates[cell], density)
+        m = round(sum(estimates.values()))
+        return {m: 1}, {m: [estimates[cell] for cell in cells]}
+
+    def estimate_probabilities(self):
+        """
+        Returns rough (probabilities, rest) as mine_probabilities does: the
+        highest density of mines among the sentences containing a cell,
+        and for cells in no sentence, the density of mines left elsewhere.
+        """
+        probabilities = dict()
+        for sentence in self.knowledge:
+            density = sentence.count / len(sentence.cells)
+            for cell in sentence.cells:
+                probabilities[cell] = max(probabilities.get(cell, 0.0),
+                                          density)
+        expected = sum(probabilities.values())
+        free = len(self.unknown) - len(probabilities)
+
+        if self.mine_count is None:
+            density = expected / len(probabilities) if probabilities else 0.5
+        else:
+            remaining = self.mine_count - len(self.mines) - expected
+            density = max(0.0, remaining) / free if free else 0.0
+        return probabilities, min(1.0, density)
 
     """
     def check_knowledge(self):
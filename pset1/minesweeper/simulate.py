@@ -0,0 +1,131 @@
+"""
+Plays MinesweeperAI against seeded Minesweeper games without a display,
+spread over a pool of processes, and reports how the AI did.
+
+Usage: python simulate.py [--json FILE] [games] [height] [width] [mines]
+                          [processes]
+
+--json also writes the summary to FILE. Game i uses seed i, and the AI's
+probability search is limited by SEARCH_STEPS rather than by time, so
+runs with the same arguments play the same games on any machine and
+under any load.
+"""
+
+import concurrent.futures
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Steps the AI's probability search may take on one frontier component
+# before it estimates instead
+SEARCH_STEPS = 200000
+
+# Points of each game, as fractions of its moves, where knowledge base
+# size is reported
+PROGRESS = [0.1 * i for i in range(11)]
+
+
+def play(seed, height, width, mines):
+    """
+    Plays one game, returning a dict with whether the AI won, its number
+    of moves, the seconds it spent choosing moves and drawing inferences,
+    and the size of its knowledge base after each move.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines)
+    ai.PROBABILITY_TIME = math.inf
+    ai.PROBABILITY_STEPS = SEARCH_STEPS
+    thinking = 0.0
+    sizes = []
+    won = False
+
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        thinking += time.perf_counter() - start
+        if move is None or game.is_mine(move):
+            break
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.nearby_mines(move))
+        thinking += time.perf_counter() - start
+        sizes.append(len(ai.knowledge))
+
+        if len(ai.moves_made) == height * width - mines:
+            won = True
+            break
+
+    return {"won": won, "moves": len(sizes), "thinking": thinking,
+            "sizes": sizes}
+
+
+def summarize(results, seconds):
+    """
+    Returns a dict of statistics over the results of play.
+    """
+    moves = sum(result["moves"] for result in results)
+    thinking = sum(result["thinking"] for result in results)
+    sizes = []
+    for fraction in PROGRESS:
+        points = [result["sizes"][round(fraction * (result["moves"] - 1))]
+                  for result in results if result["moves"]]
+        sizes.append(sum(points) / len(points) if points else 0)
+    return {
+        "games": len(results),
+        "win rate": sum(result["won"] for result in results) / len(results),
+        "moves": moves,
+        "moves per second": moves / seconds,
+        "inference ms per move": 1000 * thinking / moves if moves else 0,
+        "knowledge base size": dict(zip(
+            [f"{fraction:.0%}" for fraction in PROGRESS], sizes
+        )),
+        "seconds": seconds
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    path = None
+    if args[:1] == ["--json"]:
+        if len(args) < 2:
+            sys.exit("Usage: python simulate.py [--json FILE] [games] "
+                     "[height] [width] [mines] [processes]")
+        path, args = args[1], args[2:]
+    defaults = [1000, 8, 8, 8, os.cpu_count() or 1]
+    games, height, width, mines, processes = (
+        [int(arg) for arg in args] + defaults[len(args):]
+    )
+
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        results = list(executor.map(
+            play, range(games), [height] * games, [width] * games,
+            [mines] * games, chunksize=max(1, games // (4 * processes))
+        ))
+    summary = summarize(results, time.perf_counter() - start)
+
+    print(f"{games} games of {height}x{width} with {mines} mines, "
+          f"pool of {processes}, {summary['seconds']:.1f}s")
+    print(f"    win rate              {summary['win rate']:.1%}")
+    print(f"    moves per second      {summary['moves per second']:.0f}")
+    print(f"    inference per move    "
+          f"{summary['inference ms per move']:.3f}ms")
+    print("    knowledge base size   " + " ".join(
+        f"{size:.1f}" for size in summary["knowledge base size"].values()
+    ) + "  (0% to 100% of moves)")
+
+    if path:
+        with open(path, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()